@@ -3,9 +3,13 @@ Database configuration - shared across all sports.
 Supports demo mode without database for predictions.
 """
 import os
-from typing import Optional
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Iterator, Optional
 from dotenv import load_dotenv
 
+if TYPE_CHECKING:
+    from sqlmodel import Session
+
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
@@ -45,8 +49,12 @@ def init_db():
         print("ℹ️ Skipping database init (demo mode)")
 
 
-def get_session():
-    """Yield a database session (or None in demo mode)."""
+@contextmanager
+def get_session() -> Iterator[Optional["Session"]]:
+    """
+    Context manager for a database session (None in demo mode).
+    Usage: ``with get_session() as session: ...`` - the session is closed on exit.
+    """
     if engine is None:
         yield None
         return
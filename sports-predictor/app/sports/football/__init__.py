@@ -2,6 +2,8 @@
 Football (Soccer) Sport Module
 Registers football as a sport in the application.
 """
+import importlib
+
 from app.core.registry import SportConfig, register_sport
 
 # Import all components
@@ -14,8 +16,21 @@ from app.sports.football.etl import FootballETL
 from app.sports.football.analytics import FootballAnalytics
 from app.sports.football.ui.dashboard import show_dashboard
 from app.sports.football.ui.prediction_view import show_prediction_view
-from app.sports.football.ui.rushbet_view import show_rushbet_view
-from app.sports.football.ui.player_browser import show_player_browser
+
+
+def _lazy_view(module_name: str, func_name: str):
+    """
+    Vista que importa su módulo en la primera llamada.
+    Las vistas de cuotas y jugadores arrastran pandas y los renderers: solo se cargan al abrirlas.
+    """
+    def view(*args, **kwargs):
+        return getattr(importlib.import_module(module_name), func_name)(*args, **kwargs)
+    view.__name__ = func_name
+    return view
+
+
+show_rushbet_view = _lazy_view("app.sports.football.ui.rushbet_view", "show_rushbet_view")
+show_player_browser = _lazy_view("app.sports.football.ui.player_browser", "show_player_browser")
 
 # Register this sport
 register_sport(SportConfig(
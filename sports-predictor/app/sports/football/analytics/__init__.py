@@ -1,31 +1,47 @@
 # Football Analytics unified module
-from .models.poisson import PoissonEngine, poisson_probability
-from .models.elo import ELORating
+import importlib
 
-from .predictive.goals import (
-    calculate_expected_goals,
-    predict_goals_markets,
-    get_full_match_prediction
-)
-from .predictive.advanced import AdvancedPredictor
-from .predictive.players import PlayerPredictor
+# Exportaciones perezosas: cada nombre se importa desde su submódulo en el primer acceso.
+# Así importar el paquete (registro del deporte, vistas) no arrastra scipy.stats vía AdvancedPredictor.
+_LAZY_EXPORTS = {
+    'PoissonEngine': '.models.poisson',
+    'poisson_probability': '.models.poisson',
+    'ELORating': '.models.elo',
+    'calculate_expected_goals': '.predictive.goals',
+    'predict_goals_markets': '.predictive.goals',
+    'get_full_match_prediction': '.predictive.goals',
+    'AdvancedPredictor': '.predictive.advanced',
+    'PlayerPredictor': '.predictive.players',
+    # Stats exports
+    'get_team_corners_avg': '.data.team_stats',
+    'get_team_corners_conceded_avg': '.data.team_stats',
+    'get_team_shots_avg': '.data.team_stats',
+    'get_team_possession_avg': '.data.team_stats',
+    'get_team_cards_avg': '.data.team_stats',
+    'get_team_goals_avg': '.data.team_stats',
+    'get_team_goals_conceded_avg': '.data.team_stats',
+    'get_team_btts_pct': '.data.team_stats',
+    'get_team_clean_sheet_pct': '.data.team_stats',
+    'get_team_fouls_avg': '.data.team_stats',
+    'get_team_over_under_pct': '.data.team_stats',
+    'get_player_impact_score': '.impact_engine',
+    'FootballAnalytics': '.football_analytics',
+}
+
+
+def __getattr__(name):
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    # Cachear en el módulo: los accesos siguientes no vuelven a pasar por __getattr__
+    globals()[name] = value
+    return value
 
-from .data.team_stats import (
-    get_team_corners_avg,
-    get_team_corners_conceded_avg,
-    get_team_shots_avg,
-    get_team_possession_avg,
-    get_team_cards_avg,
-    get_team_goals_avg,
-    get_team_goals_conceded_avg,
-    get_team_btts_pct,
-    get_team_clean_sheet_pct,
-    get_team_fouls_avg,
-    get_team_over_under_pct
-)
 
-from .impact_engine import get_player_impact_score
-from .football_analytics import FootballAnalytics
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_EXPORTS))
+
 
 __all__ = [
     'FootballAnalytics',
@@ -50,4 +66,3 @@ __all__ = [
     'get_team_fouls_avg',
     'get_team_over_under_pct'
 ]
-
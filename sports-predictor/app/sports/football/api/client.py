@@ -2,6 +2,8 @@
 Football API Client - Integration with API-Sports.
 """
 import os
+import threading
+import time
 import requests
 import logging
 from typing import Any, Dict, List
@@ -17,6 +19,11 @@ logger = logging.getLogger(__name__)
 API_KEY = os.getenv("API_KEY")
 BASE_URL = "https://v3.football.api-sports.io"
 
+# Límite de peticiones por segundo a API-Sports, compartido por los hilos que usan el cliente
+MAX_REQUESTS_PER_SECOND = float(os.getenv("API_MAX_RPS", "5"))
+# Esperas (s) entre reintentos cuando la API responde 429 (Too Many Requests)
+RATE_LIMIT_BACKOFF = (2, 4, 8)
+
 # Log API key status on module load
 if API_KEY:
     masked_key = API_KEY[:4] + "..." + API_KEY[-4:] if len(API_KEY) > 8 else "***"
@@ -33,6 +40,35 @@ headers = {
 class FootballAPIClient(ISportAPIClient):
     """API client for football data from API-Sports."""
     
+    def __init__(self):
+        # Sesión HTTP reutilizada entre peticiones (keep-alive: sin repetir el handshake TLS)
+        self._http = requests.Session()
+        self._http.headers.update(headers)
+        # Ritmo de peticiones: instante mínimo en que puede salir la siguiente
+        self._rate_lock = threading.Lock()
+        self._next_request_at = 0.0
+    
+    def _throttle(self) -> None:
+        """Espacia las peticiones para no superar MAX_REQUESTS_PER_SECOND (seguro entre hilos)."""
+        if MAX_REQUESTS_PER_SECOND <= 0:
+            return
+        with self._rate_lock:
+            now = time.monotonic()
+            wait = self._next_request_at - now
+            self._next_request_at = max(now, self._next_request_at) + 1 / MAX_REQUESTS_PER_SECOND
+        if wait > 0:
+            time.sleep(wait)
+    
+    def _get(self, url: str, **kwargs) -> requests.Response:
+        """GET con límite de ritmo y reintentos con espera exponencial ante 429."""
+        for delay in RATE_LIMIT_BACKOFF + (None,):
+            self._throttle()
+            response = self._http.get(url, **kwargs)
+            if response.status_code != 429 or delay is None:
+                return response
+            logger.warning(f"[API-429] Rate limit alcanzado, reintentando en {delay}s")
+            time.sleep(delay)
+    
     def get_events(self, league_id: int, season: int) -> List[Dict[str, Any]]:
         """
         Fetch fixtures for a league and season.
@@ -42,7 +78,7 @@ class FootballAPIClient(ISportAPIClient):
         params = {'league': league_id, 'season': season}
         
         try:
-            response = requests.get(url, headers=headers, params=params, timeout=30)
+            response = self._get(url, params=params, timeout=30)
             logger.info(f"[API-RESPONSE] Status: {response.status_code}")
             
             if response.status_code == 401:
@@ -72,7 +108,7 @@ class FootballAPIClient(ISportAPIClient):
         logger.info(f"Fetching stats for fixture {event_id}")
         url = f"{BASE_URL}/fixtures/statistics"
         params = {'fixture': event_id}
-        response = requests.get(url, headers=headers, params=params)
+        response = self._get(url, params=params)
         response.raise_for_status()
         data = response.json().get('response', [])
         logger.info(f"Successfully fetched stats for {len(data)} teams in fixture {event_id}")
@@ -85,7 +121,7 @@ class FootballAPIClient(ISportAPIClient):
         logger.info(f"Fetching lineups for fixture {event_id}")
         url = f"{BASE_URL}/fixtures/lineups"
         params = {'fixture': event_id}
-        response = requests.get(url, headers=headers, params=params)
+        response = self._get(url, params=params)
         response.raise_for_status()
         data = response.json().get('response', [])
         logger.info(f"Successfully fetched lineups for {len(data)} teams in fixture {event_id}")
@@ -99,7 +135,7 @@ class FootballAPIClient(ISportAPIClient):
         params = {}
         if country:
             params['country'] = country
-        response = requests.get(url, headers=headers, params=params)
+        response = self._get(url, params=params)
         response.raise_for_status()
         return response.json().get('response', [])
     
@@ -109,7 +145,7 @@ class FootballAPIClient(ISportAPIClient):
         """
         url = f"{BASE_URL}/teams"
         params = {'league': league_id, 'season': season}
-        response = requests.get(url, headers=headers, params=params)
+        response = self._get(url, params=params)
         response.raise_for_status()
         return response.json().get('response', [])
     
@@ -120,7 +156,7 @@ class FootballAPIClient(ISportAPIClient):
         """
         logger.info("Fetching all available leagues")
         url = f"{BASE_URL}/leagues"
-        response = requests.get(url, headers=headers)
+        response = self._get(url)
         response.raise_for_status()
         data = response.json().get('response', [])
         logger.info(f"Successfully fetched {len(data)} leagues")
@@ -134,7 +170,7 @@ class FootballAPIClient(ISportAPIClient):
         logger.info(f"Fetching injuries for league {league_id}, season {season}")
         url = f"{BASE_URL}/injuries"
         params = {'league': league_id, 'season': season}
-        response = requests.get(url, headers=headers, params=params)
+        response = self._get(url, params=params)
         response.raise_for_status()
         data = response.json().get('response', [])
         logger.info(f"Successfully fetched {len(data)} injury records")
@@ -153,7 +189,7 @@ class FootballAPIClient(ISportAPIClient):
         
         while True:
             params['page'] = page
-            response = requests.get(url, headers=headers, params=params)
+            response = self._get(url, params=params)
             response.raise_for_status()
             result = response.json()
             data = result.get('response', [])
@@ -176,7 +212,7 @@ class FootballAPIClient(ISportAPIClient):
         logger.info(f"Fetching predictions for fixture {fixture_id}")
         url = f"{BASE_URL}/predictions"
         params = {'fixture': fixture_id}
-        response = requests.get(url, headers=headers, params=params)
+        response = self._get(url, params=params)
         response.raise_for_status()
         data = response.json().get('response', [])
         logger.info(f"Successfully fetched predictions for fixture {fixture_id}")
@@ -190,7 +226,7 @@ class FootballAPIClient(ISportAPIClient):
         logger.info(f"Fetching player stats for fixture {fixture_id}")
         url = f"{BASE_URL}/fixtures/players"
         params = {'fixture': fixture_id}
-        response = requests.get(url, headers=headers, params=params)
+        response = self._get(url, params=params)
         response.raise_for_status()
         data = response.json().get('response', [])
         logger.info(f"Successfully fetched player stats for {len(data)} teams in fixture {fixture_id}")
@@ -233,7 +269,7 @@ class FootballAPIClient(ISportAPIClient):
         }
         
         try:
-            response = requests.get(url, headers=headers, params=params, timeout=30)
+            response = self._get(url, params=params, timeout=30)
             logger.info(f"[API-RESPONSE] Status: {response.status_code}")
             
             if response.status_code == 401:
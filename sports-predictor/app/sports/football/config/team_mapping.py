@@ -46,13 +46,13 @@ def get_mapped_team_id(source_name: str, session: Optional[Session] = None) -> O
     
     clean_name = source_name.strip()
     
-    # Crear sesión si no se provee
+    # Crear sesión si no se provee (se cierra al salir del bloque)
     if session is None:
         from app.core.database import get_session
-        session = next(get_session())
-        should_close = True
-    else:
-        should_close = False
+        with get_session() as own_session:
+            if own_session is None:  # Modo demo: sin BD no hay mapeos
+                return None
+            return get_mapped_team_id(clean_name, own_session)
     
     try:
         # 1. Buscar en mapeos existentes
@@ -80,9 +80,6 @@ def get_mapped_team_id(source_name: str, session: Optional[Session] = None) -> O
     except Exception as e:
         logger.error(f"Error en get_mapped_team_id: {e}")
         return None
-    finally:
-        if should_close:
-            session.close()
 
 
 def _auto_match_team(source_name: str, session: Session) -> Optional[tuple[int, float]]:
@@ -4,7 +4,7 @@ Este módulo se encarga de obtener datos de la API oficial (API-Sports),
 procesarlos a los modelos de la base de datos y guardarlos de forma eficiente.
 """
 import logging
-import time
+from collections import deque
 from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 from typing import Any, Dict, List, Optional, Generator
@@ -20,6 +20,14 @@ from app.sports.football.config.leagues import (
     PRIORITY_LEAGUES, ALLOWED_LEAGUE_IDS, REGION_MAP, get_region
 )
 
+# Ligas cuyos partidos se descargan en paralelo en sync_priority_leagues
+# (el cliente de la API limita además las peticiones por segundo)
+PRIORITY_SYNC_WORKERS = 4
+# Partidos cuyos detalles se descargan a la vez en un batch (3 peticiones cada uno)
+DETAILS_SYNC_WORKERS = 4
+# Descargas de detalles en vuelo o pendientes de guardar (ventana deslizante del batch)
+DETAILS_PREFETCH = DETAILS_SYNC_WORKERS * 2
+
 # Configuración del sistema de logs
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -45,16 +53,14 @@ class FootballETL(ISportETL):
         Administrador de contexto para sesiones de base de datos.
         Asegura que los cambios se guarden (commit) o se cancelen (rollback) en caso de error.
         """
-        session = next(get_session())
-        try:
-            yield session
-            session.commit()
-        except Exception as e:
-            session.rollback()
-            logger.error(f"Error en la base de datos: {e}")
-            raise
-        finally:
-            session.close()
+        with get_session() as session:
+            try:
+                yield session
+                session.commit()
+            except Exception as e:
+                session.rollback()
+                logger.error(f"Error en la base de datos: {e}")
+                raise
     
     # ═══════════════════════════════════════════════════════
     # MÉTODOS PÚBLICOS DE SINCRONIZACIÓN
@@ -69,6 +75,10 @@ class FootballETL(ISportETL):
         
         # 1. Obtener partidos de la API
         fixtures_data = self.api_client.get_events(league_id, season)
+        return self._store_league_fixtures(league_id, fixtures_data, sync_details)
+    
+    def _store_league_fixtures(self, league_id: int, fixtures_data: List, sync_details: bool = False) -> int:
+        """Guarda los partidos descargados de una liga (y sus detalles si se solicita)."""
         if not fixtures_data:
             logger.warning(f"[SYNC] No se encontraron partidos para la liga {league_id}")
             return 0
@@ -97,14 +107,18 @@ class FootballETL(ISportETL):
         
         results = {"success": 0, "error": 0, "total": len(all_ids)}
         
-        for league_id in all_ids:
-            try:
-                count = self.sync_league_data(league_id, season, sync_details)
-                results["success"] += 1
-                logger.info(f"[BATCH] Liga {league_id} completada: {count} partidos")
-            except Exception as e:
-                logger.error(f"[BATCH] Error en liga {league_id}: {e}")
-                results["error"] += 1
+        # Descargas en paralelo (I/O); el guardado en BD sigue siendo secuencial en este hilo
+        # para no competir por los mismos equipos/ligas desde varias sesiones
+        with ThreadPoolExecutor(max_workers=PRIORITY_SYNC_WORKERS) as executor:
+            futures = {league_id: executor.submit(self.api_client.get_events, league_id, season) for league_id in all_ids}
+            for league_id, future in futures.items():
+                try:
+                    count = self._store_league_fixtures(league_id, future.result(), sync_details)
+                    results["success"] += 1
+                    logger.info(f"[BATCH] Liga {league_id} completada: {count} partidos")
+                except Exception as e:
+                    logger.error(f"[BATCH] Error en liga {league_id}: {e}")
+                    results["error"] += 1
         
         return results
     
@@ -187,6 +201,13 @@ class FootballETL(ISportETL):
         logger.info(f"[DETAILS] Procesando detalles del partido {event_id}")
         
         # 1. Llamadas en paralelo a la API
+        details = self._fetch_event_details(event_id)
+        
+        # 2. Guardar datos procesados
+        self._store_event_details(event_id, details, session)
+    
+    def _fetch_event_details(self, event_id: int) -> tuple:
+        """Descarga (stats, lineups, players) de un partido con las 3 peticiones en paralelo."""
         # Usamos ThreadPoolExecutor para lanzar las 3 peticiones simultáneamente
         with ThreadPoolExecutor(max_workers=3) as executor:
             future_stats = executor.submit(self.api_client.get_event_stats, event_id)
@@ -194,11 +215,11 @@ class FootballETL(ISportETL):
             future_players = executor.submit(self.api_client.get_fixture_players, event_id)
             
             # Recogemos los resultados (esto espera a que terminen, pero en paralelo es más rápido)
-            stats_data = future_stats.result()
-            lineups_data = future_lineups.result()
-            players_data = future_players.result()
-        
-        # 2. Guardar datos procesados
+            return future_stats.result(), future_lineups.result(), future_players.result()
+    
+    def _store_event_details(self, event_id: int, details: tuple, session: Optional[Session] = None) -> None:
+        """Guarda los detalles descargados; usa 'session' si se da o abre una nueva."""
+        stats_data, lineups_data, players_data = details
         # Lógica para usar sesión existente o crear una nueva
         if session:
             self._process_stats(event_id, stats_data, session)
@@ -240,28 +261,34 @@ class FootballETL(ISportETL):
     # PROCESAMIENTO INTERNO (PRIVADO)
     # ═══════════════════════════════════════════════════════
     
-    def _sync_fixture_details_batch(self, fixture_ids: List[int], delay: float = 0.5) -> None:
+    def _sync_fixture_details_batch(self, fixture_ids: List[int]) -> None:
         """
-        Sincroniza detalles por lotes con un pequeño retraso para evitar 
-        bloqueos por límite de peticiones (Rate Limit) de la API.
+        Sincroniza detalles por lotes. Las descargas de varios partidos se lanzan
+        en paralelo (el cliente HTTP ya limita las peticiones por segundo) y se
+        guardan en orden en este hilo.
         
         OPTIMIZACIÓN: Usa una sola sesión de BD para todo el lote.
         """
         logger.info(f"[DETAILS-BATCH] Procesando {len(fixture_ids)} partidos")
         
         # Usamos una sola sesión persistente para todo el proceso del batch
-        with self._get_db_session() as session:
+        # (la sesión no es thread-safe: los hilos solo descargan, no escriben)
+        with self._get_db_session() as session, ThreadPoolExecutor(max_workers=DETAILS_SYNC_WORKERS) as executor:
+            # Ventana deslizante: como mucho DETAILS_PREFETCH partidos descargados sin guardar en memoria
+            window = deque(executor.submit(self._fetch_event_details, fid) for fid in fixture_ids[:DETAILS_PREFETCH])
             for i, fid in enumerate(fixture_ids):
+                future = window.popleft()
+                # Reponer la ventana antes de guardar: la siguiente descarga avanza mientras escribimos
+                if i + DETAILS_PREFETCH < len(fixture_ids):
+                    window.append(executor.submit(self._fetch_event_details, fixture_ids[i + DETAILS_PREFETCH]))
                 try:
                     # Pasamos la sesión explícitamente para reutilizarla
-                    self.sync_event_details(fid, session=session)
+                    self._store_event_details(fid, future.result(), session=session)
                     
                     # Commit periódico cada 50 items para no sobrecargar la transacción
                     if (i + 1) % 50 == 0:
                         session.commit()
                         logger.info(f"[DETAILS-BATCH] Progreso: {i + 1}/{len(fixture_ids)} (Commit parcial)")
-                    
-                    time.sleep(delay)
                 except Exception as e:
                     logger.warning(f"[DETAILS-BATCH] Partido {fid} falló: {e}")
                     # En caso de error, hacemos rollback parcial pero intentamos seguir con otros?
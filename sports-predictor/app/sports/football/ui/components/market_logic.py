@@ -1,11 +1,13 @@
-import copy
+import functools
 
 def _redistribute_markets(markets: dict) -> dict:
     """
     Reorganiza mercados mal ubicados en el JSON original hacia sus categorías correctas
     según la arquitectura de UI definida.
     """
-    m = copy.deepcopy(markets)
+    # Solo se copian las listas por categoría: los dicts de mercado/outcome se comparten sin copiar
+    # (nadie los modifica; se reubican por referencia)
+    m = {cat: list(mkts) if isinstance(mkts, list) else mkts for cat, mkts in markets.items()}
     
     # 1. Mover 'Paradas del portero' desde tiempo_reglamentario o eventos
     # 2. Buscar 'Disparos jugador' mal ubicados
@@ -65,21 +67,34 @@ def _redistribute_markets(markets: dict) -> dict:
 
     return m
 
-def _sort_markets_by_order(markets: list, orden: list) -> list:
-    """Ordena mercados según lista de patrones."""
-    def get_priority(market):
-        label_lower = market.get("label", "").lower()
-        for i, (pattern, _) in enumerate(orden):
-            if pattern in label_lower:
-                return i
-        return 999
-    
-    return sorted(markets, key=get_priority)
+@functools.lru_cache(maxsize=256)
+def _market_priority(label: str, orden: tuple) -> int:
+    """Índice del primer patrón de `orden` contenido en el label (999 si ninguno)."""
+    label_lower = label.lower()
+    for i, (pattern, _) in enumerate(orden):
+        if pattern in label_lower:
+            return i
+    return 999
 
-def _get_market_format(label: str, orden: list) -> str:
-    """Determina si el mercado es card o list según el orden."""
+@functools.lru_cache(maxsize=256)
+def _market_format(label: str, orden: tuple) -> str:
+    """Formato (card/list) del primer patrón de `orden` contenido en el label."""
     label_lower = label.lower()
     for pattern, formato in orden:
         if pattern in label_lower:
             return formato
     return "card"
+
+def _sort_markets_by_order(markets: list, orden: list) -> list:
+    """Ordena mercados según lista de patrones."""
+    orden = tuple(orden)
+    return sorted(markets, key=lambda market: _market_priority(market.get("label", ""), orden))
+
+def _sort_market_pairs(pairs, orden: list) -> list:
+    """Ordena pares (label, outcomes) según lista de patrones."""
+    orden = tuple(orden)
+    return sorted(pairs, key=lambda pair: _market_priority(pair[0], orden))
+
+def _get_market_format(label: str, orden: list) -> str:
+    """Determina si el mercado es card o list según el orden."""
+    return _market_format(label, tuple(orden))
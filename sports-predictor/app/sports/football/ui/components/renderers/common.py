@@ -1,7 +1,13 @@
+from collections import defaultdict
+from operator import itemgetter
+import re
+
+import orjson
+import numpy as np
 import streamlit as st
 import pandas as pd
-from ..styles import _apply_table_styles, get_card_html, get_section_title_html, render_styled_table
-from ..market_logic import _sort_markets_by_order, _get_market_format
+from ..styles import _apply_table_styles, get_card_html, get_section_title_html, render_styled_table, render_html_table
+from ..market_logic import _sort_market_pairs, _get_market_format
 
 
 # Mercados que requieren API Premium (estadísticas por mitad)
@@ -40,43 +46,121 @@ PREMIUM_MARKET_PATTERNS = [
     "total de goles de por parte de - 2", # Caso específico Rushbet
 ]
 
+_PREMIUM_MARKET_RE = re.compile("|".join(map(re.escape, PREMIUM_MARKET_PATTERNS)))
+
+# Detección de tipo de mercado en _render_as_list (una pasada de regex por patrón)
+_HALF_RE = re.compile(r"mitad|parte")
+_SECOND_HALF_RE = re.compile(r"2\.?ª|segunda")
+_FIRST_HALF_GOALS_RE = re.compile(r"1\.?ª parte|medio tiempo")
+_HANDICAP_RE = re.compile(r"hándicap|handicap|asiático")
+_CORNERS_RE = re.compile(r"esquina|corner")
+
+# Tablas con menos filas que este umbral se emiten como HTML estático (sin pandas/Styler)
+HTML_TABLE_MAX_ROWS = 50
+
 
 def _is_premium_market(label: str) -> bool:
     """
     Detecta si un mercado requiere datos de API Premium.
     Usa lista explícita de mercados definidos en PREMIUM_MARKET_PATTERNS.
     """
-    label_lower = label.lower()
-    return any(pattern in label_lower for pattern in PREMIUM_MARKET_PATTERNS)
+    return _PREMIUM_MARKET_RE.search(label.lower()) is not None
+
+
+def _ou_by_line(table: dict) -> dict:
+    """
+    Convierte una tabla Poisson {"2.5": {"over": p, "under": q}} a {2.5: (p, q)}.
+    Se construye una vez por mercado para indexar directamente con la línea (float).
+    """
+    if not table:
+        return {}
+    return {float(k): (v.get("over", 0), v.get("under", 0)) for k, v in table.items()}
+
+
+def _analysis_key(analysis_data: dict) -> bytes:
+    """
+    Serializa analysis_data una sola vez (en C, vía orjson) para usarlo como clave de caché.
+    Streamlit hashea bytes directamente en lugar de recorrer el dict anidado.
+    """
+    if not analysis_data:
+        return b""
+    return orjson.dumps(analysis_data, option=orjson.OPT_SORT_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+def _sort_correct_scores(outcomes: list, score_matrix: dict):
+    """
+    Ordena outcomes de resultado correcto por (goles local, goles visitante) y obtiene
+    su probabilidad (%) de la matriz Poisson. Labels sin marcador van al final con prob None.
+    """
+    labels = pd.Series([out.get("label", "") for out in outcomes], dtype=object)
+    goals = labels.str.extract(r"(\d+)\s*-\s*(\d+)")
+    home = pd.to_numeric(goals[0]).fillna(999).astype(int).to_numpy()
+    away = pd.to_numeric(goals[1]).fillna(999).astype(int).to_numpy()
+    order = np.lexsort((away, home))
+    
+    probs = np.full(len(outcomes), np.nan)
+    if score_matrix:
+        valid = goals[0].notna().to_numpy()
+        score_keys = pd.Series(home.astype(str), dtype=object) + "-" + pd.Series(away.astype(str), dtype=object)
+        probs = pd.Series(score_matrix, dtype=float).reindex(score_keys.where(valid)).to_numpy() * 100
+    
+    return ([outcomes[i] for i in order],
+            [None if np.isnan(probs[i]) else round(float(probs[i]), 1) for i in order])
+
+
+def _frame_from_rows(rows: list, columns: list) -> pd.DataFrame:
+    """DataFrame construido por columnas (dict de listas), más rápido que desde una lista de dicts."""
+    return pd.DataFrame({col: [row.get(col) for row in rows] for col in columns})
+
+
+def _ou_prob(t: tuple, out_label: str) -> float:
+    """Probabilidad de un outcome Over/Under a partir de (over, under)."""
+    return t[0] if out_label == "Over" else t[1]
+
+
+def _handicap_prob(t: tuple, out_label: str) -> float:
+    """Probabilidad de un outcome de hándicap: "1" = local, "2" = visitante, resto = push."""
+    return t[0] if out_label == "1" else t[1] if out_label == "2" else t[2]
+
+
+def _normalize_lines(raw_lines: list):
+    """Normaliza en bloque las líneas de un mercado ("2500" -> 2.5). Devuelve (valores, válidos, textos)."""
+    arr = pd.to_numeric(pd.Series(raw_lines, dtype=object), errors="coerce").to_numpy(dtype=float, copy=True)
+    valid = np.isfinite(arr)
+    arr[valid & (np.abs(arr) >= 50)] /= 1000.0
+    safe = np.where(valid, arr, 0.0)
+    is_int = safe == np.trunc(safe)
+    display = np.where(is_int, safe.astype(np.int64).astype(str), safe.astype(str))
+    return arr.tolist(), valid.tolist(), display.tolist()
+
+
+def _handicaps_by_line(table: dict) -> dict:
+    """Convierte la tabla de hándicaps {"-0.5": {...}} a {-0.5: (win, loss, push)}."""
+    if not table:
+        return {}
+    return {float(k): (v.get("win", 0), v.get("loss", 0), v.get("push", 0)) for k, v in table.items()}
 
 def _render_category_markets(markets: list, home_team: str, away_team: str, orden: list = None, analysis_data: dict = None):
     """Renderiza los mercados de una categoría."""
     
     label_map = {"1": home_team, "X": "Empate", "2": away_team, "Over": "Más de", "Under": "Menos de"}
     
+    # Clave de caché del análisis: se calcula una vez por categoría y se reutiliza en cada mercado
+    analysis_key = _analysis_key(analysis_data)
+    
     # 1. AGRUPAR MERCADOS POR LABEL
-    grouped_markets = {}
+    grouped_markets = defaultdict(list)
     for market in markets:
-        lbl = market.get("label", "Mercado")
-        if lbl not in grouped_markets:
-            grouped_markets[lbl] = []
-        grouped_markets[lbl].extend(market.get("outcomes", []))
-    
-    # Reconstruir lista de mercados únicos consolidados
-    consolidated_markets = []
-    for lbl, outcomes in grouped_markets.items():
-        consolidated_markets.append({"label": lbl, "outcomes": outcomes})
+        grouped_markets[market.get("label", "Mercado")].extend(market.get("outcomes", []))
 
-    # 2. ORDENAR
+    # 2. ORDENAR (tupla para reutilizar las búsquedas memoizadas de market_logic)
     if orden:
-        final_markets = _sort_markets_by_order(consolidated_markets, orden)
+        orden = tuple(orden)
+        final_markets = _sort_market_pairs(grouped_markets.items(), orden)
     else:
-        final_markets = consolidated_markets
+        final_markets = grouped_markets.items()
 
-    for market in final_markets:
-        label = market.get("label", "Mercado")
-        outcomes = market.get("outcomes", [])
-        
+    for label, outcomes in final_markets:
         if not outcomes:
             continue
         
@@ -90,122 +174,185 @@ def _render_category_markets(markets: list, home_team: str, away_team: str, orde
             is_list = has_lines or len(outcomes) > 4
         
         if is_list:
-            _render_as_list(label, outcomes, label_map, analysis_data, home_team, away_team)
+            _render_as_list(label, outcomes, label_map, analysis_data, home_team, away_team, has_lines=has_lines)
         else:
-            _render_as_card(label, outcomes, label_map, analysis_data, home_team, away_team)
+            _render_as_card(label, outcomes, label_map, analysis_data, home_team, away_team, analysis_key=analysis_key)
 
 
-def _render_as_card(label: str, outcomes: list, label_map: dict, analysis_data: dict = None, home_team: str = None, away_team: str = None):
-    """Renderiza mercado como cards horizontales con probabilidades opcionales."""
-    is_premium = _is_premium_market(label)
-    st.markdown(get_section_title_html(label, coming_soon=is_premium), unsafe_allow_html=True)
-    
-    unique_outcomes = {}
-    for out in outcomes:
-        key = (out.get("label"), out.get("line"))
-        unique_outcomes[key] = out
-    
-    sorted_outcomes = list(unique_outcomes.values())
-    
-    # Obtener probabilidades según el tipo de mercado
-    probs = {}
+def _market_half(label_lower: str) -> int:
+    """Devuelve 1 o 2 si el mercado es de 1ª/2ª parte, 0 si es de partido completo."""
+    if "parte" in label_lower or "mitad" in label_lower:
+        if "1" in label_lower: return 1
+        if "2" in label_lower: return 2
+    return 0
+
+
+def _probs_1x2(label_lower: str, analysis_data: dict) -> dict:
+    data_1x2 = analysis_data.get("1x2", {})
+    return {"1": data_1x2.get("home_win"), "X": data_1x2.get("draw"), "2": data_1x2.get("away_win")}
+
+
+def _probs_btts(label_lower: str, analysis_data: dict) -> dict:
+    half = _market_half(label_lower)
+    if half == 2:
+        return {} # 2a parte no disponible
+    data_btts = analysis_data.get("halftime", {}).get("btts", {}) if half == 1 else analysis_data.get("btts", {})
+    return {"Sí": data_btts.get("yes"), "Yes": data_btts.get("yes"), "No": data_btts.get("no")}
+
+
+def _probs_double_chance(label_lower: str, analysis_data: dict) -> dict:
+    half = _market_half(label_lower)
+    if half == 2:
+        return {} # 2a parte no disponible
+    if half == 1:
+        data_1x2 = analysis_data.get("halftime", {}).get("1x2", {})
+        h, d, a = data_1x2.get("home", 0), data_1x2.get("draw", 0), data_1x2.get("away", 0)
+    else:
+        data_1x2 = analysis_data.get("1x2", {})
+        h, d, a = data_1x2.get("home_win", 0), data_1x2.get("draw", 0), data_1x2.get("away_win", 0)
+    return {"1X": h + d, "12": h + a, "X2": d + a}
+
+
+def _probs_draw_no_bet(label_lower: str, analysis_data: dict) -> dict:
+    half = _market_half(label_lower)
+    if half == 2:
+        return {} # 2a parte no disponible
+    if half == 1:
+        data_1x2 = analysis_data.get("halftime", {}).get("1x2", {})
+        h, a = data_1x2.get("home", 0), data_1x2.get("away", 0)
+    else:
+        data_1x2 = analysis_data.get("1x2", {})
+        h, a = data_1x2.get("home_win", 0), data_1x2.get("away_win", 0)
+    total = h + a
+    return {"1": h / total, "2": a / total} if total > 0 else {}
+
+
+def _probs_halftime_1x2(label_lower: str, analysis_data: dict) -> dict:
+    # 1X2 Medio Tiempo (sin HT/FT)
+    ht_data = analysis_data.get("halftime", {}).get("1x2", {})
+    return {"1": ht_data.get("home"), "X": ht_data.get("draw"), "2": ht_data.get("away")}
+
+
+def _probs_goal_both_halves(label_lower: str, analysis_data: dict) -> dict:
+    # Probabilidad de gol en ambas mitades usando datos de halftime
+    ht_ou = analysis_data.get("halftime", {}).get("over_under", {})
+    if "0.5" not in ht_ou:
+        return {}
+    # Aproximación: P(gol 1ª) * P(gol 2ª), asumiendo similar para 2ª mitad
+    prob_goal_ht = ht_ou.get("0.5", {}).get("over", 0.5)
+    prob_both = prob_goal_ht * prob_goal_ht * 1.2  # Factor correlación
+    return {"Sí": min(prob_both, 0.95), "Yes": min(prob_both, 0.95), "No": max(1 - prob_both, 0.05)}
+
+
+def _probs_winner(key: str):
+    """Handler 1X2 para 'Mayor número de ...' (corners / tarjetas)."""
+    def handler(label_lower: str, analysis_data: dict) -> dict:
+        data = analysis_data.get(key)
+        winner = data.get("winner", {}) if data else None
+        if not winner:
+            return {}
+        return {"1": winner.get("home"), "X": winner.get("draw"), "2": winner.get("away")}
+    return handler
+
+
+# Clasificador de mercados tipo card -> handler de probabilidades.
+# Primero se busca el label exacto; si no, se recorre la tabla y gana la primera coincidencia.
+_CARD_PROBS_EXACT = {
+    "resultado final": _probs_1x2,
+    "1x2": _probs_1x2,
+}
+
+_CARD_PROBS_CLASSIFIER = (
+    (lambda s: "resultado final" in s, _probs_1x2),
+    (lambda s: "ambos equipos" in s or "btts" in s, _probs_btts),
+    (lambda s: "doble oportunidad" in s, _probs_double_chance),
+    (lambda s: "sin empate" in s or "draw no bet" in s, _probs_draw_no_bet),
+    (lambda s: "descanso" in s and "/" not in s, _probs_halftime_1x2),
+    (lambda s: "gol en ambas mitades" in s, _probs_goal_both_halves),
+    (lambda s: ("mayor" in s or "más" in s) and ("esquina" in s or "corner" in s), _probs_winner("corners")),
+    (lambda s: ("mayor" in s or "más" in s) and "tarjeta" in s, _probs_winner("cards")),
+)
+
+
+def _compute_card_probs(label: str, analysis_data: dict) -> dict:
+    """Obtiene las probabilidades de un mercado tipo card según su label."""
     label_lower = label.lower()
-    if analysis_data:
-        if "resultado final" in label_lower or label_lower == "1x2":
-            data_1x2 = analysis_data.get("1x2", {})
-            probs = {"1": data_1x2.get("home_win"), "X": data_1x2.get("draw"), "2": data_1x2.get("away_win")}
-        elif "ambos equipos" in label_lower or "btts" in label_lower:
-            if "1" in label_lower and ("parte" in label_lower or "mitad" in label_lower):
-                data_btts = analysis_data.get("halftime", {}).get("btts", {})
-                probs = {"Sí": data_btts.get("yes"), "Yes": data_btts.get("yes"), "No": data_btts.get("no")}
-            elif "2" in label_lower and ("parte" in label_lower or "mitad" in label_lower):
-                 probs = {} # 2a parte no disponible
-            else:
-                data_btts = analysis_data.get("btts", {})
-                probs = {"Sí": data_btts.get("yes"), "Yes": data_btts.get("yes"), "No": data_btts.get("no")}
-        elif "doble oportunidad" in label_lower:
-            if "1" in label_lower and ("parte" in label_lower or "mitad" in label_lower):
-                data_1x2 = analysis_data.get("halftime", {}).get("1x2", {})
-                h, d, a = data_1x2.get("home", 0), data_1x2.get("draw", 0), data_1x2.get("away", 0)
-                probs = {"1X": h + d, "12": h + a, "X2": d + a}
-            elif "2" in label_lower and ("parte" in label_lower or "mitad" in label_lower):
-                probs = {} # 2a parte no disponible
-            else:
-                data_1x2 = analysis_data.get("1x2", {})
-                h, d, a = data_1x2.get("home_win", 0), data_1x2.get("draw", 0), data_1x2.get("away_win", 0)
-                probs = {"1X": h + d, "12": h + a, "X2": d + a}
-        elif "sin empate" in label_lower or "draw no bet" in label_lower:
-            if "1" in label_lower and ("parte" in label_lower or "mitad" in label_lower):
-                data_1x2 = analysis_data.get("halftime", {}).get("1x2", {})
-                h, a = data_1x2.get("home", 0), data_1x2.get("away", 0)
-                total = h + a
-                if total > 0: probs = {"1": h / total, "2": a / total}
-            elif "2" in label_lower and ("parte" in label_lower or "mitad" in label_lower):
-                probs = {} # 2a parte no disponible
-            else:
-                data_1x2 = analysis_data.get("1x2", {})
-                h, a = data_1x2.get("home_win", 0), data_1x2.get("away_win", 0)
-                total = h + a
-                if total > 0: probs = {"1": h / total, "2": a / total}
-        elif "descanso" in label_lower and "/" not in label_lower:
-            # 1X2 Medio Tiempo (sin HT/FT)
-            ht_data = analysis_data.get("halftime", {}).get("1x2", {})
-            probs = {"1": ht_data.get("home"), "X": ht_data.get("draw"), "2": ht_data.get("away")}
-        elif "gol en ambas mitades" in label_lower:
-            # Probabilidad de gol en ambas mitades usando datos de halftime
-            ht_ou = analysis_data.get("halftime", {}).get("over_under", {})
-            if "0.5" in ht_ou:
-                # Aproximación: P(gol 1ª) * P(gol 2ª)
-                prob_goal_ht = ht_ou.get("0.5", {}).get("over", 0.5)
-                # Asumimos similar para 2ª mitad
-                prob_both = prob_goal_ht * prob_goal_ht * 1.2  # Factor correlación
-                probs = {"Sí": min(prob_both, 0.95), "Yes": min(prob_both, 0.95), "No": max(1 - prob_both, 0.05)}
-        elif ("mayor" in label_lower or "más" in label_lower) and ("esquina" in label_lower or "corner" in label_lower):
-            # Mayor número de corners: 1X2
-            corners_data = analysis_data.get("corners") if analysis_data else None
-            if corners_data:
-                corners_winner = corners_data.get("winner", {})
-                if corners_winner:
-                    probs = {"1": corners_winner.get("home"), "X": corners_winner.get("draw"), "2": corners_winner.get("away")}
-        elif ("mayor" in label_lower or "más" in label_lower) and "tarjeta" in label_lower:
-            # Mayor número de tarjetas: 1X2
-            cards_data = analysis_data.get("cards") if analysis_data else None
-            if cards_data:
-                cards_winner = cards_data.get("winner", {})
-                if cards_winner:
-                    probs = {"1": cards_winner.get("home"), "X": cards_winner.get("draw"), "2": cards_winner.get("away")}
+    handler = _CARD_PROBS_EXACT.get(label_lower)
+    if handler is None:
+        for matches, candidate in _CARD_PROBS_CLASSIFIER:
+            if matches(label_lower):
+                handler = candidate
+                break
+        else:
+            return {}
+    return handler(label_lower, analysis_data)
+
+
+def _build_card_market_html(label: str, outcomes: list, label_map: dict, probs: dict) -> str:
+    """Construye el HTML completo (título + grilla de cards) de un mercado tipo card."""
+    is_premium = _is_premium_market(label)
     
-    n_cols = min(len(sorted_outcomes), 4)
-    if n_cols == 0: n_cols = 1
-    cols = st.columns(n_cols)
+    # Deduplicar por (label, línea): el último outcome gana
+    sorted_outcomes = list({(out.get("label"), out.get("line")): out for out in outcomes}.values())
     
-    for i, outcome in enumerate(sorted_outcomes):
-        with cols[i % n_cols]:
-            odds = outcome.get("odds", 0)
-            out_label = outcome.get("label", "")
-            line = outcome.get("line")
-            
-            display_label = label_map.get(out_label, out_label)
-            if line:
-                display_label = f"{display_label} ({line})"
-            
-            # Obtener probabilidad si existe
-            prob = probs.get(out_label)
-            
-            # Negrita para equipos/empate en resultado final
-            if out_label in ["1", "X", "2"] and "resultado final" in label.lower():
-                display_label = f"<b>{display_label}</b>"
-            elif out_label in label_map.values(): 
-                 display_label = f"<b>{display_label}</b>"
+    # Todas las cards del mercado se acumulan en un solo bloque HTML (un único st.markdown)
+    # con una grilla CSS de hasta 4 columnas en lugar de st.columns
+    n_cols = min(len(sorted_outcomes), 4) or 1
+    label_values = frozenset(label_map.values())
+    is_full_time_result = "resultado final" in label.lower()
+    cards_html = []
+    for outcome in sorted_outcomes:
+        odds = outcome.get("odds", 0)
+        out_label = outcome.get("label", "")
+        line = outcome.get("line")
+        
+        display_label = label_map.get(out_label, out_label)
+        if line:
+            display_label = f"{display_label} ({line})"
+        
+        # Obtener probabilidad si existe
+        prob = probs.get(out_label)
+        
+        # Negrita para equipos/empate en resultado final
+        if out_label in ("1", "X", "2") and is_full_time_result:
+            display_label = f"<b>{display_label}</b>"
+        elif out_label in label_values: 
+             display_label = f"<b>{display_label}</b>"
 
-            st.markdown(get_card_html(display_label, odds, prob), unsafe_allow_html=True)
+        cards_html.append(get_card_html(display_label, odds, prob).strip())
     
-    st.markdown("")
+    grid_html = (
+        f'<div style="display:grid;grid-template-columns:repeat({n_cols},1fr);gap:12px;margin-bottom:16px;">'
+        f'{"".join(cards_html)}</div>'
+    )
+    return get_section_title_html(label, coming_soon=is_premium) + grid_html
+
 
+@st.cache_data(show_spinner=False, max_entries=512)
+def _cached_card_market_html(label: str, outcomes_key: bytes, label_map_key: tuple, analysis_key: bytes,
+                             _outcomes: list, _analysis_data: dict) -> str:
+    """
+    HTML del mercado cacheado entre reruns. Solo se hashean las claves serializadas;
+    outcomes y análisis (prefijo _) no se hashean.
+    """
+    probs = _compute_card_probs(label, _analysis_data) if _analysis_data else {}
+    return _build_card_market_html(label, _outcomes, dict(label_map_key), probs)
 
-def _render_as_list(label: str, outcomes: list, label_map: dict, analysis_data: dict = None, home_team: str = None, away_team: str = None):
+
+def _render_as_card(label: str, outcomes: list, label_map: dict, analysis_data: dict = None, home_team: str = None, away_team: str = None, analysis_key: bytes = None):
+    """Renderiza mercado como cards horizontales con probabilidades opcionales."""
+    if analysis_key is None:
+        analysis_key = _analysis_key(analysis_data)
+    outcomes_key = orjson.dumps(outcomes, option=orjson.OPT_SERIALIZE_NUMPY)
+    html = _cached_card_market_html(label, outcomes_key, tuple(label_map.items()), analysis_key,
+                                    outcomes, analysis_data or None)
+    st.markdown(html, unsafe_allow_html=True)
+
+
+def _render_as_list(label: str, outcomes: list, label_map: dict, analysis_data: dict = None, home_team: str = None, away_team: str = None, has_lines: bool = None):
     """Renderiza mercado como tabla con todas las líneas."""
-    has_lines = any(out.get("line") for out in outcomes)
+    if has_lines is None:
+        has_lines = any(out.get("line") for out in outcomes)
     
     if has_lines:
         is_premium = _is_premium_market(label)
@@ -214,7 +361,8 @@ def _render_as_list(label: str, outcomes: list, label_map: dict, analysis_data:
         lines_data = {}
         processed_keys = set()
         
-        # Datos de Poisson si están disponibles
+        # Datos de Poisson si están disponibles (sin análisis no se inyectan probabilidades)
+        skip_prob_inject = not analysis_data
         poisson_ou = analysis_data.get("over_under", {}) if analysis_data else {}
         poisson_handicaps = analysis_data.get("handicaps", {}) if analysis_data else {}
         
@@ -223,25 +371,77 @@ def _render_as_list(label: str, outcomes: list, label_map: dict, analysis_data:
         
         # Mejor detección de equipo específico
         has_team_name = (home_team and home_team.lower() in label_lower) or (away_team and away_team.lower() in label_lower)
-        is_specific_team = has_team_name or (" de " in label_lower and ("mitad" in label_lower or "parte" in label_lower))
+        is_specific_team = has_team_name or (" de " in label_lower and _HALF_RE.search(label_lower) is not None)
 
         # Excluir explícitamente 2a mitad
-        is_second_half = "2ª" in label_lower or "2.ª" in label_lower or "segunda" in label_lower
+        is_second_half = _SECOND_HALF_RE.search(label_lower) is not None
 
-        is_halftime_goals = ("total de goles" in label_lower 
-                             and ("1ª parte" in label_lower or "1.ª parte" in label_lower or "medio tiempo" in label_lower)
+        is_goals_total = "total de goles" in label_lower
+        is_halftime_goals = (is_goals_total
+                             and _FIRST_HALF_GOALS_RE.search(label_lower) is not None
                              and not is_specific_team)
-        is_total_goals = ("total de goles" in label_lower 
+        is_total_goals = (is_goals_total
                           and "equipo" not in label_lower 
                           and not is_specific_team
                           and not is_halftime_goals
                           and not is_second_half)
-        is_handicap = "hándicap" in label_lower or "handicap" in label_lower or "asiático" in label_lower
+        is_handicap = _HANDICAP_RE.search(label_lower) is not None
         # Corners y tarjetas (solo mercados totales del partido)
-        is_total_corners = ("esquina" in label_lower or "corner" in label_lower) and "total" in label_lower and not is_specific_team
+        is_corners = _CORNERS_RE.search(label_lower) is not None
+        is_total_corners = is_corners and "total" in label_lower and not is_specific_team
         is_total_cards = ("tarjeta" in label_lower) and "total" in label_lower and not is_specific_team
         
-        for out in outcomes:
+        col_name_first = "Comienza en" if "3-way" in label_lower else "Valor"
+        
+        # Una sola tabla Poisson por mercado, indexada por línea (float), y su resolver.
+        # Prioridad si coincidiera más de un tipo: hándicap > tarjetas > corners > equipo 1ª parte > 1ª parte > partido
+        prob_source = None
+        prob_resolver = None
+        if not skip_prob_inject:
+            is_home_label = home_team and home_team.lower() in label_lower
+            is_away_label = away_team and away_team.lower() in label_lower
+            ht_data = analysis_data.get("halftime", {})
+            corners_data = analysis_data.get("corners") or {}
+            cards_data = analysis_data.get("cards") or {}
+            
+            candidates = []
+            if is_handicap:
+                candidates.append((_handicaps_by_line(poisson_handicaps), _handicap_prob))
+            if cards_data:
+                if is_total_cards:
+                    candidates.append((_ou_by_line(cards_data.get("over_under", {})), _ou_prob))
+                elif "tarjeta" in label_lower:
+                    if is_home_label:
+                        candidates.append((_ou_by_line(cards_data.get("over_under_home")), _ou_prob))
+                    elif is_away_label:
+                        candidates.append((_ou_by_line(cards_data.get("over_under_away")), _ou_prob))
+            if corners_data:
+                if is_total_corners:
+                    candidates.append((_ou_by_line(corners_data.get("over_under", {})), _ou_prob))
+                elif is_corners:
+                    # "a favor de Lecce" -> equipo local o visitante
+                    if is_home_label:
+                        candidates.append((_ou_by_line(corners_data.get("over_under_home")), _ou_prob))
+                    elif is_away_label:
+                        candidates.append((_ou_by_line(corners_data.get("over_under_away")), _ou_prob))
+            if is_specific_team and ("1" in label_lower or "primer" in label_lower):
+                if is_home_label:
+                    candidates.append((_ou_by_line(ht_data.get("over_under_home")), _ou_prob))
+                elif is_away_label:
+                    candidates.append((_ou_by_line(ht_data.get("over_under_away")), _ou_prob))
+            if is_halftime_goals:
+                candidates.append((_ou_by_line(ht_data.get("over_under", {})), _ou_prob))
+            if is_total_goals:
+                candidates.append((_ou_by_line(poisson_ou), _ou_prob))
+            
+            for table, resolver in candidates:
+                if table:
+                    prob_source, prob_resolver = table, resolver
+                    break
+        
+        line_vals, line_valid, line_strs = _normalize_lines([out.get("line") for out in outcomes])
+        
+        for out, val, is_valid, base_str in zip(outcomes, line_vals, line_valid, line_strs):
             raw_line = out.get("line")
             odds = out.get("odds", 0)
             out_label = out.get("label", "")
@@ -251,163 +451,45 @@ def _render_as_list(label: str, outcomes: list, label_map: dict, analysis_data:
                 continue
             processed_keys.add(unique_key)
             
-            display_line = raw_line
             line_sort_key = 0
+            line_val = None
             
-            if raw_line is not None:
-                try:
-                    val = float(raw_line)
-                    # Normalización de líneas tipo "2500" -> "2.5"
-                    if abs(val) >= 50: 
-                        val = val / 1000.0
-                    
-                    if val.is_integer():
-                        base_str = str(int(val))
-                    else:
-                        base_str = str(val)
-                    
-                    is_handicap_mkt = "hándicap" in label.lower() or "handicap" in label.lower() or "asiático" in label.lower()
-                    if is_handicap_mkt and val > 0:
-                        display_line = f"+{base_str}"
-                    else:
-                        display_line = base_str
-                    
-                    line_sort_key = val
-                except:
-                    display_line = str(raw_line)
-                    line_sort_key = 0
+            if is_valid:
+                if is_handicap and val > 0:
+                    display_line = f"+{base_str}"
+                else:
+                    display_line = base_str
+                
+                line_sort_key = val
+                line_val = val
+            elif raw_line is not None:
+                display_line = str(raw_line)
             else:
                 display_line = ""
 
-            col_name_first = "Valor"
-            if "3-way" in label.lower():
-                col_name_first = "Comienza en"
-
-            if line_sort_key not in lines_data:
-                lines_data[line_sort_key] = {col_name_first: display_line}
+            row = lines_data.setdefault(line_sort_key, {col_name_first: display_line})
             
             display_label = label_map.get(out_label, out_label)
-            lines_data[line_sort_key][display_label] = odds
+            row[display_label] = odds
             
             # --- INYECCIÓN DE PROBABILIDAD (POISSON) ---
-            # Over/Under (Partido Completo)
-            if is_total_goals and str(line_sort_key) in poisson_ou:
-                p_data = poisson_ou[str(line_sort_key)]
-                prob_val = p_data["over"] if out_label == "Over" else p_data["under"]
-                prob_col_name = f"Prob. % ({display_label})"
-                lines_data[line_sort_key][prob_col_name] = round(prob_val * 100, 1)
-
-            # Over/Under (1ª Parte)
-            if is_halftime_goals:
-                ht_ou = analysis_data.get("halftime", {}).get("over_under", {}) if analysis_data else {}
-                if str(line_sort_key) in ht_ou:
-                    p_data = ht_ou[str(line_sort_key)]
-                    prob_val = p_data["over"] if out_label == "Over" else p_data["under"]
-                    prob_col_name = f"Prob. % ({display_label})"
-                    lines_data[line_sort_key][prob_col_name] = round(prob_val * 100, 1)
-
-            # Goles por equipo (1ª Parte)
-            if is_specific_team and ("1" in label_lower or "primer" in label_lower):
-                ht_data = analysis_data.get("halftime", {}) if analysis_data else {}
-                is_home = home_team and home_team.lower() in label_lower
-                is_away = away_team and away_team.lower() in label_lower
-                
-                target_ou = None
-                if is_home:
-                    target_ou = ht_data.get("over_under_home")
-                elif is_away:
-                    target_ou = ht_data.get("over_under_away")
-                
-                if target_ou and str(line_sort_key) in target_ou:
-                    p_data = target_ou[str(line_sort_key)]
-                    prob_val = p_data["over"] if out_label == "Over" else p_data["under"]
-                    prob_col_name = f"Prob. % ({display_label})"
-                    lines_data[line_sort_key][prob_col_name] = round(prob_val * 100, 1)
-            
-            # Handicap Asiático
-            if is_handicap and str(line_sort_key) in poisson_handicaps:
-                h_data = poisson_handicaps[str(line_sort_key)]
-                # Mapear labels: "1" = home win, "2" = away win
-                if out_label == "1":
-                    prob_val = h_data.get("win", 0)
-                elif out_label == "2":
-                    prob_val = h_data.get("loss", 0)
-                else:
-                    prob_val = h_data.get("push", 0)
-                prob_col_name = f"Prob. % ({display_label})"
-                lines_data[line_sort_key][prob_col_name] = round(prob_val * 100, 1)
-            
-            # Corners part
-            corners_data = analysis_data.get("corners", {}) if analysis_data else {}
-            if corners_data:
-                # Total Corners
-                if is_total_corners:
-                    corners_ou = corners_data.get("over_under", {})
-                    if str(line_sort_key) in corners_ou:
-                        c_data = corners_ou[str(line_sort_key)]
-                        prob_val = c_data["over"] if out_label == "Over" else c_data["under"]
-                        prob_col_name = f"Prob. % ({display_label})"
-                        lines_data[line_sort_key][prob_col_name] = round(prob_val * 100, 1)
-
-                # Team Corners
-                elif "esquina" in label_lower or "corner" in label_lower:
-                    # Detectar si es equipo local o visitante
-                    # "a favor de Lecce"
-                    is_home_corner = home_team and home_team.lower() in label_lower
-                    is_away_corner = away_team and away_team.lower() in label_lower
-                    
-                    target_ou = None
-                    if is_home_corner:
-                        target_ou = corners_data.get("over_under_home")
-                    elif is_away_corner:
-                        target_ou = corners_data.get("over_under_away")
-                        
-                    if target_ou and str(line_sort_key) in target_ou:
-                        c_data = target_ou[str(line_sort_key)]
-                        prob_val = c_data["over"] if out_label == "Over" else c_data["under"]
-                        prob_col_name = f"Prob. % ({display_label})"
-                        lines_data[line_sort_key][prob_col_name] = round(prob_val * 100, 1)
-            
-            # Cards part
-            cards_data = analysis_data.get("cards", {}) if analysis_data else {}
-            if cards_data:
-                # Total Cards
-                if is_total_cards:
-                    cards_ou = cards_data.get("over_under", {})
-                    if str(line_sort_key) in cards_ou:
-                        t_data = cards_ou[str(line_sort_key)]
-                        prob_val = t_data["over"] if out_label == "Over" else t_data["under"]
-                        prob_col_name = f"Prob. % ({display_label})"
-                        lines_data[line_sort_key][prob_col_name] = round(prob_val * 100, 1)
-
-                # Team Cards
-                elif "tarjeta" in label_lower:
-                    is_home_card = home_team and home_team.lower() in label_lower
-                    is_away_card = away_team and away_team.lower() in label_lower
-                    
-                    target_ou = None
-                    if is_home_card:
-                         target_ou = cards_data.get("over_under_home")
-                    elif is_away_card:
-                         target_ou = cards_data.get("over_under_away")
-                         
-                    if target_ou and str(line_sort_key) in target_ou:
-                        t_data = target_ou[str(line_sort_key)]
-                        prob_val = t_data["over"] if out_label == "Over" else t_data["under"]
-                        prob_col_name = f"Prob. % ({display_label})"
-                        lines_data[line_sort_key][prob_col_name] = round(prob_val * 100, 1)
+            if prob_source is not None and line_val is not None:
+                t = prob_source.get(line_val)
+                if t is not None:
+                    row[f"Prob. % ({display_label})"] = round(prob_resolver(t, out_label) * 100, 1)
 
-        rows = [lines_data[k] for k in sorted(lines_data.keys())]
+        # El dict se mantiene para fusionar outcomes de la misma línea; se ordena por pares (línea, fila)
+        rows = [row for _, row in sorted(lines_data.items(), key=itemgetter(0))]
         
         if rows:
-            df = pd.DataFrame(rows)
-            
-            first_col = [c for c in df.columns if c in ["Valor", "Comienza en"]][0]
+            # Columnas en orden de aparición (igual que pd.DataFrame(rows))
+            columns = list(dict.fromkeys(col for row in rows for col in row))
+            first_col = [c for c in columns if c in ["Valor", "Comienza en"]][0]
             
             # Ordenar columnas inteligentemente
             priority_cols = ["Más de", "Prob. % (Más de)", "Menos de", "Prob. % (Menos de)", "Si", "No", "Empate"]
             sorted_cols = [first_col]
-            remaining = [c for c in df.columns if c != first_col]
+            remaining = [c for c in columns if c != first_col]
             
             for p in priority_cols:
                 if p in remaining:
@@ -415,33 +497,18 @@ def _render_as_list(label: str, outcomes: list, label_map: dict, analysis_data:
                     remaining.remove(p)
             sorted_cols.extend(remaining)
             
-            df = df[sorted_cols]
-            
-            column_config = {}
-            numeric_cols_for_style = []
+            numeric_cols_for_style = [col for col in sorted_cols if col != first_col]
             
-            for col in sorted_cols:
-                if col != first_col:
-                    numeric_cols_for_style.append(col)
-                    if "Prob. %" in col:
-                        column_config[col] = st.column_config.NumberColumn(
-                            label=col,
-                            format="%.1f%%"
-                        )
-                    else:
-                        column_config[col] = st.column_config.NumberColumn(
-                            label=col,
-                            format="%.2f"
-                        )
+            # Formato resuelto en Python (sin column_config): "%" para probabilidades, 2 decimales para cuotas
+            formats = {col: "{:.1f}%" if "Prob. %" in col else "{:.2f}" for col in numeric_cols_for_style}
             
-            styler = _apply_table_styles(df, numeric_cols_for_style)
-
-            st.dataframe(
-                styler, 
-                hide_index=True, 
-                width='stretch',
-                column_config=column_config
-            )
+            if len(rows) < HTML_TABLE_MAX_ROWS:
+                # Tabla pequeña: HTML directo
+                st.markdown(render_html_table(rows, sorted_cols, numeric_cols_for_style, formats), unsafe_allow_html=True)
+            else:
+                df = _frame_from_rows(rows, sorted_cols)
+                styler = _apply_table_styles(df, numeric_cols_for_style).format(formats, na_rep="")
+                st.dataframe(styler, hide_index=True, width='stretch')
     else:
         # Sin líneas (ej. Resultado Correcto)
         unique_outcomes = {}
@@ -462,27 +529,16 @@ def _render_as_list(label: str, outcomes: list, label_map: dict, analysis_data:
              # Obtener matriz de probabilidades Poisson si está disponible
              score_matrix = analysis_data.get("score_matrix", {}) if analysis_data else {}
              
+             score_probs = [None] * len(final_outcomes)
              if is_result_correct:
-                 def get_score_sort_key(outcome):
-                     lbl = outcome.get("label", "")
-                     try:
-                         if "-" in lbl:
-                             parts = lbl.split("-")
-                             p1 = int(''.join(filter(str.isdigit, parts[0])))
-                             p2 = int(''.join(filter(str.isdigit, parts[1])))
-                             return (p1, p2)
-                         return (999, 999)
-                     except:
-                         return (999, 999)
-
-                 final_outcomes.sort(key=get_score_sort_key)
+                 final_outcomes, score_probs = _sort_correct_scores(final_outcomes, score_matrix)
 
              data = []
              col_name_res = "Resultado"
              if is_half_time_full_time:
                  col_name_res = "Descanso / Final"
              
-             for out in final_outcomes:
+             for out, score_prob in zip(final_outcomes, score_probs):
                  lbl = out.get("label", "")
                  row = {
                      col_name_res: lbl,
@@ -490,16 +546,8 @@ def _render_as_list(label: str, outcomes: list, label_map: dict, analysis_data:
                  }
                  
                  # Agregar probabilidad Poisson si está disponible
-                 if score_matrix and is_result_correct and "-" in lbl:
-                     try:
-                         parts = lbl.split("-")
-                         home_goals = int(''.join(filter(str.isdigit, parts[0])))
-                         away_goals = int(''.join(filter(str.isdigit, parts[1])))
-                         score_key = f"{home_goals}-{away_goals}"
-                         if score_key in score_matrix:
-                             row["Prob. %"] = round(score_matrix[score_key] * 100, 1)
-                     except:
-                         pass
+                 if score_prob is not None:
+                     row["Prob. %"] = score_prob
                  
                  # HT/FT: calcular probabilidad combinando medio tiempo y final
                  if is_half_time_full_time and analysis_data and "/" in lbl:
@@ -527,24 +575,21 @@ def _render_as_list(label: str, outcomes: list, label_map: dict, analysis_data:
                  
                  data.append(row)
              
-             df_rc = pd.DataFrame(data)
-             
              # Columnas numéricas
              numeric_cols = ["Cuota"]
-             col_config = {"Cuota": st.column_config.NumberColumn(format="%.2f")}
-             
-             if "Prob. %" in df_rc.columns:
+             has_prob = any("Prob. %" in row for row in data)
+             if has_prob:
                  numeric_cols.append("Prob. %")
-                 col_config["Prob. %"] = st.column_config.NumberColumn(format="%.1f%%")
              
-             styler_rc = _apply_table_styles(df_rc, numeric_cols)
-
-             st.dataframe(
-                 styler_rc, 
-                 hide_index=True, 
-                 width='stretch',
-                 column_config=col_config
-             )
+             formats = {"Cuota": "{:.2f}", "Prob. %": "{:.1f}%"}
+             if len(data) < HTML_TABLE_MAX_ROWS:
+                 st.markdown(render_html_table(data, [col_name_res] + numeric_cols, numeric_cols, formats), unsafe_allow_html=True)
+             else:
+                 df_rc = _frame_from_rows(data, [col_name_res] + numeric_cols)
+                 styler_rc = _apply_table_styles(df_rc, numeric_cols).format(
+                     {col: formats[col] for col in numeric_cols}, na_rep=""
+                 )
+                 st.dataframe(styler_rc, hide_index=True, width='stretch')
         else:
              _render_as_card(label, final_outcomes, label_map)
     
@@ -1,10 +1,79 @@
+import functools
+import itertools
+import re
+import unicodedata
+from numbers import Real
+from operator import itemgetter
+import numpy as np
 import streamlit as st
 import pandas as pd
-from ..styles import _apply_table_styles, get_section_title_html, render_styled_table
-from .common import _render_as_card
+from sqlalchemy import any_, func
+from sqlalchemy.dialects.postgresql import array
+from sqlmodel import select, or_
+from app.core.database import get_session
+from app.sports.football.models import PlayerMatchStats, Player, Fixture
+from ..styles import _apply_table_styles, get_section_title_html, render_styled_table, render_html_table
+from .common import HTML_TABLE_MAX_ROWS, _render_as_card
+
+# Clasificación de mercados de goleadores: "primer goleador" (ambas palabras, cualquier orden) o "marcará"
+_SCORER_RE = re.compile(r"(?P<first>^(?=.*primer)(?=.*goleador))|(?P<any>marca|cualquier momento)", re.I)
+_PLAYER_CARD_RE = re.compile(r"recibirá", re.I)
+# Outcomes "sin goleador" (Ningún goleador, Ningun jugador marcará, ...): match sin copiar el nombre en minúsculas
+_NO_SCORER_RE = re.compile(r"ning[uú]n", re.I)
+# Outcomes de línea (Más de / Menos de) mezclados entre los de jugador
+_OVER_UNDER_NAME_RE = re.compile(r"más de|menos de", re.I)
+
+_ODDS_FORMAT = "{:.2f}"
+_PROB_FORMAT = "{:.1f}%"
+
+# Formato por columna de las tablas de jugadores (compartido por el HTML estático y el Styler)
+_TABLE_FORMATS = {
+    col: _ODDS_FORMAT
+    for col in ("Primer Gol", "Marcará", "Tarjeta", "Roja", "Cuota", "Asistencia", "Fuera Área", "Cabeza")
+}
+_TABLE_FORMATS["Prob. %"] = _PROB_FORMAT
+
+
+def _format_cell(fmt: str, value) -> str:
+    """Formatea valores numéricos; el resto (marcadores como "-") se muestra tal cual."""
+    return fmt.format(value) if isinstance(value, Real) else str(value)
+
+
+_STYLER_FORMATS = {col: functools.partial(_format_cell, fmt) for col, fmt in _TABLE_FORMATS.items()}
+
+
+def _player_table_styler(df: pd.DataFrame, numeric_cols: list):
+    """Styler de tablas grandes: mapa de calor + cuotas/probabilidades ya formateadas en pandas (sin column_config)."""
+    formats = {col: _STYLER_FORMATS[col] for col in df.columns if col in _STYLER_FORMATS}
+    return _apply_table_styles(df, numeric_cols).format(formats, na_rep="")
+
+
+def _in_container(render):
+    """Agrupa toda la salida de un renderer (título, tabla, cards) en un único st.container."""
+    @functools.wraps(render)
+    def wrapper(*args, **kwargs):
+        with st.container():
+            return render(*args, **kwargs)
+    return wrapper
+
+
+@functools.lru_cache(maxsize=2048)
+def _team_from_label(market_label_lower: str, home_team: str, away_team: str) -> str:
+    """Equipo mencionado en el label del mercado (memoizado: se repite en cada outcome del mercado)."""
+    if home_team is not None and home_team.lower() in market_label_lower: return home_team
+    if away_team is not None and away_team.lower() in market_label_lower: return away_team
+    return "-"
+
+
+def _infer_team(outcome: dict, market_label_lower: str, home_team: str, away_team: str, home_id=None, away_id=None) -> str:
+    """
+    Intenta inferir el equipo del jugador basado en datos disponibles.
+    market_label_lower: label del mercado ya en minúsculas (se calcula una vez por mercado).
+    """
+    # Sin equipos del partido no hay nada que inferir
+    if home_team is None and away_team is None:
+        return "-"
 
-def _infer_team(outcome: dict, market_label: str, home_team: str, away_team: str, home_id=None, away_id=None) -> str:
-    """Intenta inferir el equipo del jugador basado en datos disponibles."""
     # 1. ID Match (Prioridad)
     epid = outcome.get("eventParticipantId")
     if epid:
@@ -16,79 +85,258 @@ def _infer_team(outcome: dict, market_label: str, home_team: str, away_team: str
     if "competitorName" in outcome: return outcome["competitorName"]
     
     # 3. Contexto del Label del Mercado
-    lbl_lower = market_label.lower()
-    if home_team.lower() in lbl_lower: return home_team
-    if away_team.lower() in lbl_lower: return away_team
+    return _team_from_label(market_label_lower, home_team, away_team)
+
+
+# Marcador de "el outcome no trae equipo" (distinto de None, que sí es un valor posible)
+_NO_TEAM = object()
+
+
+def _infer_teams(outcomes: list, market_labels: list, home_team: str, away_team: str, home_id=None, away_id=None) -> list:
+    """Versión vectorizada de _infer_team para una lista de outcomes (mismas prioridades)."""
+    n = len(outcomes)
+    # Sin equipos del partido no hay nada que inferir
+    if home_team is None and away_team is None:
+        return ["-"] * n
+    team = np.full(n, "-", dtype=object)
     
-    return "-"
+    # Se aplican de menor a mayor prioridad: cada paso sobrescribe al anterior
+    # 3. Contexto del Label del Mercado (el local gana si aparecen ambos)
+    labels_lower = pd.Series(market_labels, dtype=object).str.lower()
+    for name in (away_team, home_team):
+        if name is not None:
+            team = np.where(labels_lower.str.contains(name.lower(), regex=False, na=False), name, team)
+    
+    # 2. Directamente del outcome (si la API lo provee)
+    direct = np.empty(n, dtype=object)
+    direct[:] = [out["team"] if "team" in out else out.get("competitorName", _NO_TEAM) for out in outcomes]
+    team = np.where(direct != _NO_TEAM, direct, team)
+    
+    # 1. ID Match (Prioridad)
+    epids = pd.Series([out.get("eventParticipantId") for out in outcomes], dtype=object)
+    if away_id is not None:
+        team = np.where(epids.eq(away_id), away_team, team)
+    if home_id is not None:
+        team = np.where(epids.eq(home_id), home_team, team)
+    
+    return team.tolist()
 
 
-def _get_player_weighted_prob(player_name: str, metric: str, threshold: float = 0.5, alpha: float = 0.15) -> float:
+def _named_outcomes(outcomes: list) -> list:
+    """Pares (outcome, nombre del jugador) de un mercado, descartando outcomes sin nombre."""
+    return [(out, name) for out in outcomes if (name := out.get("participant") or out.get("label"))]
+
+
+def _add_player(name_to_idx: dict, columns: dict, name: str, team: str) -> int:
+    """Registra un jugador nuevo en el acumulador columnar (dict de listas) y devuelve su fila."""
+    idx = len(columns["Jugador"])
+    name_to_idx[name] = idx
+    for values in columns.values():
+        values.append(None)
+    columns["Equipo"][idx] = team
+    columns["Jugador"][idx] = name
+    return idx
+
+
+def _set_player_value(columns: dict, idx: int, col: str, value):
+    """Asigna una celda del acumulador columnar, creando la columna si es nueva."""
+    if col not in columns:
+        columns[col] = [None] * len(columns["Jugador"])
+    columns[col][idx] = value
+
+
+def _sort_order(values: list, descending: bool = False) -> list:
+    """Índices que ordenan values con los vacíos (None/NaN) al final, como sort_values(na_position="last")."""
+    sign = -1 if descending else 1
+    
+    def key(i):
+        val = values[i]
+        return (1, 0) if val is None or val != val else (0, sign * val)
+    return sorted(range(len(values)), key=key)
+
+
+# Métrica de la UI -> atributo de PlayerMatchStats (saves no existe en el modelo actual)
+_PLAYER_METRIC_FIELDS = {
+    "goals": "goals",
+    "shots": "shots",
+    "shots_on_goal": "shots",  # Solo hay shots, no shots_on_goal
+    "yellow_cards": "cards_yellow",
+    "cards_yellow": "cards_yellow",
+    "assists": "assists",
+}
+
+
+@functools.lru_cache(maxsize=4096)
+def _normalize_player_name(name: str) -> str:
+    """Clave de matching: sin acentos, minúsculas y espacios colapsados ("José  Giménez" -> "jose gimenez")."""
+    decomposed = unicodedata.normalize("NFKD", name)
+    return " ".join("".join(c for c in decomposed if not unicodedata.combining(c)).casefold().split())
+
+
+def _build_player_index(session) -> dict:
+    """{nombre normalizado: id} de todos los jugadores (ante duplicados gana el id menor)."""
+    index = {}
+    for pid, name in session.exec(select(Player.id, Player.name).order_by(Player.id)):
+        index.setdefault(_normalize_player_name(name), pid)
+    return index
+
+
+@st.cache_resource(ttl=3600, show_spinner=False)
+def _load_player_index(_session) -> dict:
     """
-    Calcula la probabilidad ponderada (EWMA) de que un jugador supere un umbral en una métrica.
+    Índice de nombres normalizados compartido por todas las sesiones (se recarga cada hora).
+    _session (sin hashear) es la sesión del llamador: solo se usa cuando hay que construirlo.
     """
-    from app.core.database import get_session
-    from app.sports.football.models import PlayerMatchStats, Player, Fixture
-    from app.sports.football.analytics.data.team_stats import calculate_dynamic_weighted_avg
-    from sqlmodel import select
-    
-    with next(get_session()) as session:
-        # 1. Buscar jugador por nombre
-        player_stmt = select(Player).where(Player.name.contains(player_name))
-        player_obj = session.exec(player_stmt).first()
-        
-        if not player_obj:
-            return None
-            
-        # 2. Mapear métrica de la UI a la DB
-        metric_map = {
-            "goals": PlayerMatchStats.goals,
-            "shots": PlayerMatchStats.shots,
-            "shots_on_goal": PlayerMatchStats.shots,  # Solo hay shots, no shots_on_goal
-            "yellow_cards": PlayerMatchStats.cards_yellow,
-            "cards_yellow": PlayerMatchStats.cards_yellow,
-            "assists": PlayerMatchStats.assists
-            # saves no existe en el modelo actual
-        }
-        db_field = metric_map.get(metric)
-        if db_field is None: return None
-        
-        # 3. Traer últimos 20 partidos
-        stats_stmt = (
-            select(db_field)
-            .join(Fixture, Fixture.id == PlayerMatchStats.fixture_id)
-            .where(PlayerMatchStats.player_id == player_obj.id)
-            .order_by(Fixture.date.desc())
-            .limit(20)
+    return _build_player_index(_session)
+
+
+def _bulk_player_histories(session, names, field, limit_per_player: int = 20, name_index: dict = None) -> dict:
+    """
+    Historial reciente (más reciente primero) de una métrica para varios jugadores en dos consultas:
+    una para resolver nombres -> ids y otra para las stats de todos los ids.
+    name_index: {nombre normalizado: id} opcional; los nombres que resuelve no pasan por el LIKE.
+    Devuelve {nombre: [valores]} solo para los jugadores encontrados con historial.
+    """
+    names = list(dict.fromkeys(names))
+    if not names:
+        return {}
+    
+    # 0. Resolución O(1) por nombre normalizado; solo los fallos van a la búsqueda por subcadena
+    name_to_id = {}
+    if name_index:
+        for n in names:
+            pid = name_index.get(_normalize_player_name(n))
+            if pid is not None:
+                name_to_id[n] = pid
+    pending = [n for n in names if n not in name_to_id]
+    
+    # 1. Resolver nombres: el nombre de la DB contiene el buscado (sin distinguir mayúsculas).
+    # lower(name) coincide con el índice ix_football_player_name_lower (scripts/migrate_player_name_index.py)
+    name_lower = func.lower(Player.name)
+    patterns = [f"%{n.lower()}%" for n in pending]
+    if session.get_bind().dialect.name == "postgresql":
+        # Un único LIKE ANY(array) en lugar de N predicados OR
+        name_filter = name_lower.like(any_(array(patterns)))
+    else:
+        name_filter = or_(*[name_lower.like(p) for p in patterns])
+    candidates = session.exec(
+        select(Player.id, name_lower).where(name_filter).order_by(Player.id)
+    ).all() if pending else []
+    
+    # Coincidencia exacta primero (O(1) por nombre); si no, primer candidato que lo contiene
+    exact = {}
+    for pid, db_name in candidates:
+        exact.setdefault(db_name, pid)
+    for n in pending:
+        n_lower = n.lower()
+        pid = exact.get(n_lower)
+        if pid is None:
+            pid = next((pid for pid, db_name in candidates if n_lower in db_name), None)
+        if pid is not None:
+            name_to_id[n] = pid
+    if not name_to_id:
+        return {}
+    
+    # 2. Últimos partidos de todos los jugadores: ROW_NUMBER por jugador recorta en SQL
+    ranked = (
+        select(
+            PlayerMatchStats.player_id,
+            field.label("value"),
+            func.row_number().over(
+                partition_by=PlayerMatchStats.player_id, order_by=Fixture.date.desc()
+            ).label("rn"),
         )
-        history = session.exec(stats_stmt).all()
-        
+        .join(Fixture, Fixture.id == PlayerMatchStats.fixture_id)
+        .where(PlayerMatchStats.player_id.in_(set(name_to_id.values())))
+        .subquery()
+    )
+    rows = session.exec(
+        select(ranked.c.player_id, ranked.c.value)
+        .where(ranked.c.rn <= limit_per_player)
+        .order_by(ranked.c.player_id, ranked.c.rn)
+    ).all()
+    by_id = {
+        pid: [val for _, val in group]
+        for pid, group in itertools.groupby(rows, key=itemgetter(0))
+    }
+    return {n: by_id[pid] for n, pid in name_to_id.items() if by_id.get(pid)}
+
+
+@st.cache_data(ttl=300, show_spinner=False, max_entries=256)
+def _cached_player_histories(names: tuple, attr: str) -> dict:
+    """Historiales de _bulk_player_histories cacheados entre reruns (5 min) por jugadores y métrica."""
+    # Una sola sesión (conexión del pool del engine) para el índice y los historiales
+    with get_session() as session:
+        name_index = _load_player_index(session)
+        return _bulk_player_histories(session, names, getattr(PlayerMatchStats, attr), name_index=name_index)
+
+
+@functools.lru_cache(maxsize=64)
+def _ewma_weights(alpha: float, n: int) -> tuple:
+    """
+    Pesos EWMA (1-alpha)^i para n partidos (índice 0 = más reciente) y su suma,
+    mismos pesos que calculate_dynamic_weighted_avg.
+    """
+    weights = (1 - alpha) ** np.arange(n, dtype=float)
+    weights.setflags(write=False)
+    return weights, weights.sum()
+
+
+def _get_players_weighted_probs(names: list, metric: str, thresholds: list = None, alpha: float = 0.15) -> list:
+    """
+    Versión en bloque de _get_player_weighted_prob: una probabilidad (o None) por nombre,
+    con umbral opcional por fila (el historial de cada jugador se consulta una sola vez).
+    """
+    attr = _PLAYER_METRIC_FIELDS.get(metric)
+    if attr is None or not names:
+        return [None] * len(names)
+    if thresholds is None:
+        thresholds = [0.5] * len(names)
+    
+    # Clave estable: el mismo conjunto de jugadores reutiliza la entrada aunque cambie el orden
+    histories = _cached_player_histories(tuple(sorted(set(names))), attr)
+    
+    # Historial de cada jugador como array (una vez por jugador aunque aparezca en varias líneas)
+    arrays = {}
+    probs = []
+    for name, threshold in zip(names, thresholds):
+        history = histories.get(name)
         if not history:
-            return None
-            
-        # 4. Convertir a binario según umbral
-        occurrence = [1 if (val or 0) >= threshold else 0 for val in history]
-        prob = calculate_dynamic_weighted_avg(occurrence, alpha=alpha)
-        return round(prob * 100, 1)
+            probs.append(None)
+            continue
+        if name not in arrays:
+            arrays[name] = np.array([val or 0 for val in history], dtype=float)
+        values = arrays[name]
+        # EWMA de la ocurrencia (supera el umbral o no) como producto escalar con los pesos
+        weights, total = _ewma_weights(alpha, values.size)
+        probs.append(round(float(np.dot(values >= threshold, weights) / total) * 100, 1))
+    return probs
+
 
+def _get_player_weighted_prob(player_name: str, metric: str, threshold: float = 0.5, alpha: float = 0.15) -> float:
+    """
+    Calcula la probabilidad ponderada (EWMA) de que un jugador supere un umbral en una métrica.
+    """
+    return _get_players_weighted_probs([player_name], metric, [threshold], alpha)[0]
+
+@_in_container
 def _render_scorers_markets(markets: list, home_team: str, away_team: str, home_id=None, away_id=None, do_analysis: bool = False):
     """Renderiza tabla consolidada de goleadores (Primer Gol + Marcará)."""
-    players_data = {}
-    
     first_scorer_mkt = []
     anytime_scorer_mkt = []
+    # Nombres únicos en orden de aparición (para la consulta de análisis), recogidos en la misma pasada
+    all_names = {}
     
     for m in markets:
-        lbl = m.get("label", "").lower()
-        if "primer" in lbl and "goleador" in lbl:
-            # Pasar contexto del mercado a los outcomes temporalmente si es necesario
-            for out in m.get("outcomes", []):
-                out["_market_label"] = m.get("label", "")
-                first_scorer_mkt.append(out)
-        elif "marca" in lbl or "marcará" in lbl or "cualquier momento" in lbl:
-            for out in m.get("outcomes", []):
-                out["_market_label"] = m.get("label", "")
-                anytime_scorer_mkt.append(out)
+        mo = _SCORER_RE.search(m.get("label", ""))
+        if not mo:
+            continue
+        # El label del mercado viaja junto al outcome (sin modificar los datos del llamador)
+        m_label_lower = m.get("label", "").lower()
+        target = first_scorer_mkt if mo.lastgroup == "first" else anytime_scorer_mkt
+        for out, name in _named_outcomes(m.get("outcomes", ())):
+            target.append((out, name, m_label_lower))
+            all_names[name] = None
             
     if not first_scorer_mkt and not anytime_scorer_mkt:
         st.info("No hay datos de goleadores disponibles.")
@@ -99,130 +347,98 @@ def _render_scorers_markets(markets: list, home_team: str, away_team: str, home_
     # 1. CÁLCULO DE PROBABILIDADES DINÁMICAS (Si aplica)
     player_probs = {}
     if do_analysis:
-        from app.core.database import get_session
-        from app.sports.football.models import PlayerMatchStats, Player, Fixture
-        from app.sports.football.analytics.data.team_stats import calculate_dynamic_weighted_avg
-        from sqlmodel import select, or_
-        
-        with next(get_session()) as session:
-            # Recopilar todos los nombres de jugadores únicos
-            all_names = set()
-            for out in first_scorer_mkt + anytime_scorer_mkt:
-                name = out.get("participant") or out.get("label")
-                if name: all_names.add(name)
-            
-            # Buscar stats para cada jugador
-            for name in all_names:
-                # Intento de matching por nombre (simplificado)
-                player_stmt = select(Player).where(Player.name.contains(name))
-                player_obj = session.exec(player_stmt).first()
-                
-                if player_obj:
-                    # Traer últimos 20 partidos de este jugador
-                    stats_stmt = (
-                        select(PlayerMatchStats.goals)
-                        .join(Fixture, Fixture.id == PlayerMatchStats.fixture_id)
-                        .where(PlayerMatchStats.player_id == player_obj.id)
-                        .order_by(Fixture.date.desc())
-                        .limit(20)
-                    )
-                    goals_history = session.exec(stats_stmt).all()
-                    if goals_history:
-                        # Convertir a binario (marcó o no)
-                        occurrence = [1 if g > 0 else 0 for g in goals_history]
-                        prob = calculate_dynamic_weighted_avg(occurrence, alpha=0.15) # Alpha 0.15 para más sensibilidad
-                        player_probs[name] = round(prob * 100, 1)
-
-    # 2. PROCESAR OUTCOMES
-    def process_player(out, key_type):
-        name = out.get("participant") or out.get("label")
-        if not name: return
-        
-        if "ningún" in name.lower() or (name == "Sí" and key_type == "Marcará"):
-             return
-
-        if name not in players_data:
-            # Inferir equipo solo la primera vez
-            team = _infer_team(out, out.get("_market_label", ""), home_team, away_team, home_id, away_id)
-            players_data[name] = {
-                "Equipo": team, 
-                "Jugador": name, 
-                "Primer Gol": None, 
-                "Marcará": None, 
-                "Prob. %": player_probs.get(name, "-")
-            }
-        
-        # Si ya existe pero no tiene equipo, intentar inferir de nuevo
-        if players_data[name]["Equipo"] == "-":
-             team = _infer_team(out, out.get("_market_label", ""), home_team, away_team, home_id, away_id)
-             if team != "-": players_data[name]["Equipo"] = team
-             
-        players_data[name][key_type] = out.get("odds")
-
-    for out in first_scorer_mkt:
-        process_player(out, "Primer Gol")
+        # Goles >= 0.5 equivale a "marcó"
+        all_names = list(all_names)
+        player_probs = {
+            name: prob
+            for name, prob in zip(all_names, _get_players_weighted_probs(all_names, "goals"))
+            if prob is not None
+        }
 
-    for out in anytime_scorer_mkt:
-         process_player(out, "Marcará")
+    # 2. PROCESAR OUTCOMES: un mapa nombre -> cuota por columna y merge por nombre
+    first_rows = [row for row in first_scorer_mkt if not _NO_SCORER_RE.match(row[1])]
+    anytime_rows = [row for row in anytime_scorer_mkt
+                    if row[1] != "Sí" and not _NO_SCORER_RE.match(row[1])]
+    # Si un jugador se repite en la misma columna gana la última cuota
+    first_map = {name: out.get("odds") for out, name, _ in first_rows}
+    anytime_map = {name: out.get("odds") for out, name, _ in anytime_rows}
     
-    data_list = list(players_data.values())
-    if not data_list: return
-        
-    df = pd.DataFrame(data_list)
+    # Equipo: primer valor inferido distinto de "-" entre las apariciones (Primer Gol y luego Marcará).
+    # El orden de inserción fija el orden de filas (orden de aparición)
+    team_map = {}
+    for out, name, market_label_lower in itertools.chain(first_rows, anytime_rows):
+        if team_map.get(name, "-") == "-":
+            team_map[name] = _infer_team(out, market_label_lower, home_team, away_team, home_id, away_id)
     
-    # Ordenar por probabilidad si existe, sino por cuota
-    if do_analysis:
-        df["_sort_prob"] = pd.to_numeric(df["Prob. %"], errors='coerce').fillna(0)
-        df = df.sort_values(by=["_sort_prob"], ascending=False)
-    else:
-        df["_sort_any"] = df["Marcará"].fillna(9999)
-        df = df.sort_values(by=["_sort_any"])
+    names = list(team_map)
+    teams = list(team_map.values())
+    first_odds = [first_map.get(name) for name in names]
+    anytime_odds = [anytime_map.get(name) for name in names]
+    probs = [player_probs.get(name, "-") for name in names]
+    
+    if not names: return
     
     cols = ["Equipo", "Jugador", "Primer Gol", "Marcará"]
     if do_analysis: cols.append("Prob. %")
-    
-    final_df = df[list(set(cols) & set(df.columns))]
-    final_df = final_df[cols]
-    
     numeric_cols = ["Primer Gol", "Marcará"]
     if do_analysis: numeric_cols.append("Prob. %")
     
-    styler = _apply_table_styles(final_df, numeric_cols)
+    # Tablas de tamaño habitual -> orden en Python y tabla HTML estática sin DataFrame
+    if len(names) < HTML_TABLE_MAX_ROWS:
+        if do_analysis:
+            order = sorted(range(len(names)), key=lambda i: -probs[i] if isinstance(probs[i], (int, float)) else 0)
+        else:
+            order = sorted(range(len(names)), key=lambda i: (anytime_odds[i] is None, anytime_odds[i] or 0))
+        rows = [{"Equipo": teams[i], "Jugador": names[i], "Primer Gol": first_odds[i],
+                 "Marcará": anytime_odds[i], "Prob. %": probs[i]} for i in order]
+        st.markdown(render_html_table(rows, cols, numeric_cols, _TABLE_FORMATS), unsafe_allow_html=True)
+        return
+        
+    # Columnas ya en el orden final (cols): sin proyección posterior
+    data = {"Equipo": teams, "Jugador": names, "Primer Gol": first_odds, "Marcará": anytime_odds}
+    if do_analysis: data["Prob. %"] = probs
+    df = pd.DataFrame(data)
     
-    column_config = {
-        "Primer Gol": st.column_config.NumberColumn(format="%.2f"),
-        "Marcará": st.column_config.NumberColumn(format="%.2f")
-    }
+    # Ordenar por probabilidad si existe, sino por cuota
     if do_analysis:
-        column_config["Prob. %"] = st.column_config.NumberColumn(format="%.1f%%")
+        final_df = df.sort_values(by="Prob. %", ascending=False,
+                                  key=lambda col: pd.to_numeric(col, errors='coerce').fillna(0))
+    else:
+        final_df = df.sort_values(by="Marcará", na_position="last")
     
-    rows_count = len(final_df)
-    dynamic_height = (rows_count + 1) * 35 + 3
+    # Sin filas no se construye Styler
+    n = len(final_df)
+    if n == 0: return
+    dynamic_height = n * 35 + 38
+    
+    styler = _player_table_styler(final_df, numeric_cols)
     
     st.dataframe(
         styler, 
         hide_index=True, 
         width='stretch',
-        column_config=column_config,
         height=dynamic_height
     )
-    st.markdown("")
 
 
-def _render_player_cards_markets(markets: list, home_team: str, away_team: str, home_id=None, away_id=None):
+@_in_container
+def _render_player_cards_markets(markets: list, home_team: str = None, away_team: str = None, home_id=None, away_id=None,
+                                 do_analysis: bool = False):
     """Renderiza mercados de tarjetas de jugadores en tabla consolidada."""
     player_list_markets = []
     other_markets = []
     
     for m in markets:
-        lbl = m.get("label", "").lower()
-        if "recibirá" in lbl:
+        if _PLAYER_CARD_RE.search(m.get("label", "")):
             player_list_markets.append(m)
         else:
             other_markets.append(m)
             
     if player_list_markets:
-        players_data = {}
+        name_to_idx = {}
+        columns = {"Equipo": [], "Jugador": []}
+        # Presencia de cuotas por columna, registrada durante el merge (evita escanear el DataFrame)
+        has_tarjeta = has_roja = False
         
         for m in player_list_markets:
             raw_label = m.get("label", "")
@@ -236,67 +452,80 @@ def _render_player_cards_markets(markets: list, home_team: str, away_team: str,
             else:
                 col_name = raw_label 
                 
-            for out in m.get("outcomes", []):
-                p_name = out.get("participant") or out.get("label")
-                if not p_name or p_name == "Sí": 
+            # Lista de la columna resuelta una vez por mercado (_add_player la sigue extendiendo)
+            values = columns.setdefault(col_name, [None] * len(columns["Jugador"]))
+            market_has_odds = False
+            for out, p_name in _named_outcomes(m.get("outcomes", ())):
+                if p_name == "Sí": 
                     continue
                     
-                if p_name not in players_data:
-                    team = _infer_team(out, raw_label, home_team, away_team, home_id, away_id)
-                    players_data[p_name] = {"Equipo": team, "Jugador": p_name}
+                idx = name_to_idx.get(p_name)
+                if idx is None:
+                    team = _infer_team(out, lbl_lower, home_team, away_team, home_id, away_id)
+                    idx = _add_player(name_to_idx, columns, p_name, team)
                 
-                players_data[p_name][col_name] = out.get("odds")
+                odds = out.get("odds")
+                values[idx] = odds
+                market_has_odds = market_has_odds or odds is not None
+            
+            if market_has_odds:
+                if col_name == "Tarjeta": has_tarjeta = True
+                elif col_name == "Roja": has_roja = True
         
-        data_list = list(players_data.values())
-        if data_list:
+        if name_to_idx:
             st.markdown(get_section_title_html("Tarjetas de Jugadores"), unsafe_allow_html=True)
-            df = pd.DataFrame(data_list)
-            
-            if "Tarjeta" not in df.columns: df["Tarjeta"] = None
-            if "Roja" not in df.columns: df["Roja"] = None
-            
+            if do_analysis:
+                columns["Prob. %"] = _get_players_weighted_probs(columns["Jugador"], "yellow_cards")
             cols_to_show = ["Equipo", "Jugador"]
             numeric_cols = []
             
-            if df["Tarjeta"].notna().any():
+            if has_tarjeta:
                 cols_to_show.append("Tarjeta")
                 numeric_cols.append("Tarjeta")
-            if df["Roja"].notna().any():
+            if has_roja:
                 cols_to_show.append("Roja")
                 numeric_cols.append("Roja")
-                
-            if "Tarjeta" in df.columns:
-                df = df.sort_values(by="Tarjeta")
-            elif "Roja" in df.columns:
-                 df = df.sort_values(by="Roja")
-                 
-            final_df = df[cols_to_show]
-            styler = _apply_table_styles(final_df, numeric_cols)
+            has_prob = "Prob. %" in columns
+            if has_prob:
+                cols_to_show.append("Prob. %")
+                numeric_cols.append("Prob. %")
             
-            column_config = {
-                "Tarjeta": st.column_config.NumberColumn(format="%.2f"),
-                "Roja": st.column_config.NumberColumn(format="%.2f")
-            }
-            
-            rows_count = len(final_df)
-            dynamic_height = (rows_count + 1) * 35 + 3
-            
-            st.dataframe(
-                styler,
-                hide_index=True,
-                width='stretch',
-                column_config=column_config,
-                height=dynamic_height
-            )
-            st.markdown("")
+            # Tablas de tamaño habitual -> orden en Python y HTML estático (sin DataFrame, Arrow ni grid JS)
+            if len(name_to_idx) < HTML_TABLE_MAX_ROWS:
+                if has_prob:
+                    order = _sort_order(columns["Prob. %"], descending=True)
+                elif numeric_cols:
+                    order = _sort_order(columns[numeric_cols[0]])
+                else:
+                    order = range(len(name_to_idx))
+                rows = [{col: columns[col][i] for col in cols_to_show} for i in order]
+                st.markdown(render_html_table(rows, cols_to_show, numeric_cols, _TABLE_FORMATS), unsafe_allow_html=True)
+            else:
+                # Solo las columnas mostradas: la permutación se aplica a menos columnas
+                df = pd.DataFrame({col: columns[col] for col in cols_to_show})
+                if has_prob:
+                    df = df.sort_values(by="Prob. %", ascending=False, na_position="last")
+                elif numeric_cols:
+                    df = df.sort_values(by=numeric_cols[0], na_position="last")
+                
+                # name_to_idx no vacío garantiza al menos una fila
+                dynamic_height = len(df) * 35 + 38
+                styler = _player_table_styler(df, numeric_cols)
+                
+                st.dataframe(
+                    styler,
+                    hide_index=True,
+                    width='stretch',
+                    height=dynamic_height
+                )
 
     if other_markets:
         if player_list_markets: st.markdown("---")
         
         label_map = {
-            "1": home_team,
+            "1": home_team or "1",
             "X": "Empate",
-            "2": away_team,
+            "2": away_team or "2",
             "Yes": "Sí",
             "No": "No"
         }
@@ -305,6 +534,7 @@ def _render_player_cards_markets(markets: list, home_team: str, away_team: str,
             _render_as_card(m.get("label"), m.get("outcomes", []), label_map)
 
 
+@_in_container
 def _render_generic_player_table(markets: list, title: str, 
                                home_team: str, away_team: str,
                                home_id=None, away_id=None,
@@ -318,87 +548,87 @@ def _render_generic_player_table(markets: list, title: str,
 
     st.markdown(get_section_title_html(title), unsafe_allow_html=True)
     
-    players_data = []
+    # Aplanar outcomes en listas paralelas (una pasada) y construir el DataFrame de una vez
+    outs, m_labels, names, odds_list, lines = [], [], [], [], []
     
     for m in markets:
         m_label = m.get("label", "")
-        for out in m.get("outcomes", []):
-            p_name = out.get("participant") or out.get("label")
-            if not p_name: continue
-
-            if "más de" in p_name.lower() or "menos de" in p_name.lower():
+        for out, p_name in _named_outcomes(m.get("outcomes", ())):
+            if _OVER_UNDER_NAME_RE.search(p_name):
                 continue
             
-            odds = out.get("odds")
             line = out.get("line")
-            
             if line is None and not is_binary:
                 continue
             
-            team = _infer_team(out, m_label, home_team, away_team, home_id, away_id)
-            row = {"Equipo": team, "Jugador": p_name}
-            
-            # Línea interpretada
-            processed_line = 0.5
-            if line is not None:
-                try:
-                    val = float(line)
-                    if line_format_div_1000: val /= 1000.0
-                    processed_line = val
-                    
-                    if val.is_integer(): val_str = str(int(val))
-                    else: val_str = f"{val:.1f}"
-                    
-                    row[val_col_name] = f"Más de {val_str}"
-                except:
-                    row[val_col_name] = str(line)
-            else:
-                row[val_col_name] = "-"
-
-            # --- ANÁLISIS ---
-            if do_analysis and metric:
-                row["Prob. %"] = _get_player_weighted_prob(p_name, metric, threshold=processed_line)
-            
-            col_cuota = "Cuota"
-            row[col_cuota] = odds
-            players_data.append(row)
+            outs.append(out)
+            m_labels.append(m_label)
+            names.append(p_name)
+            odds_list.append(out.get("odds"))
+            lines.append(line)
             
-    if not players_data: return
+    if not names: return
     
-    df = pd.DataFrame(players_data)
+    teams = _infer_teams(outs, m_labels, home_team, away_team, home_id, away_id)
     
-    # Ordenar
-    if do_analysis and "Prob. %" in df.columns:
-        df["_sort"] = pd.to_numeric(df["Prob. %"], errors='coerce').fillna(0)
-        df = df.sort_values(by=["_sort", "Cuota"], ascending=[False, True])
-    else:
-        df = df.sort_values(by=["Cuota"])
-
-    # Columnas finales
-    cols = ["Equipo", "Jugador", val_col_name]
-    if do_analysis and "Prob. %" in df.columns: cols.append("Prob. %")
-    cols.append("Cuota")
+    # Línea interpretada (vectorizada): "Más de X", el valor crudo si no es numérico, "-" si no hay línea
+    raw_lines = pd.Series(lines, dtype=object)
+    vals = pd.to_numeric(raw_lines, errors="coerce")
+    if line_format_div_1000: vals = vals / 1000.0
+    arr = vals.to_numpy(dtype=float, copy=True)
+    is_num = ~np.isnan(arr)
+    arr[~is_num] = 0.0
+    is_int = np.mod(arr, 1.0) == 0
+    # Entero sin decimales; resto con un decimal (mismo formato que f"{val:.1f}")
+    num_str = np.where(is_int, np.char.mod("%d", arr), np.char.mod("%.1f", arr))
+    line_str = np.char.add("Más de ", num_str).astype(object)
+    line_col = np.where(is_num, line_str, [("-" if l is None or l != l else str(l)) for l in lines])
+
+    # Esquema fijo: el DataFrame se construye ya con el orden final de columnas
+    data = {"Equipo": teams, "Jugador": names, val_col_name: line_col}
     
-    df = df[[c for c in cols if c in df.columns]]
+    # --- ANÁLISIS ---
+    has_prob = bool(do_analysis and metric)
+    if has_prob:
+        thresholds = vals.fillna(0.5).tolist()
+        data["Prob. %"] = _get_players_weighted_probs(names, metric, thresholds)
+    
+    data["Cuota"] = odds_list
     
     numeric_cols = ["Cuota"]
-    if "Prob. %" in df.columns: numeric_cols.append("Prob. %")
+    if has_prob: numeric_cols.append("Prob. %")
+    
+    n = len(names)
+    # Tablas de tamaño habitual -> orden en Python y HTML estático directo desde las columnas
+    if n < HTML_TABLE_MAX_ROWS:
+        # Probabilidad desconocida cuenta como 0; cuota ascendente con las vacías al final
+        odds_order = _sort_order(odds_list)
+        if has_prob:
+            probs = data["Prob. %"]
+            order = sorted(odds_order, key=lambda i: -(probs[i] or 0))
+        else:
+            order = odds_order
+        rows = [{col: values[i] for col, values in data.items()} for i in order]
+        st.markdown(render_html_table(rows, list(data), numeric_cols, _TABLE_FORMATS), unsafe_allow_html=True)
+        return
     
-    styler = _apply_table_styles(df, numeric_cols)
+    df = pd.DataFrame(data)
+    
+    # Ordenar (probabilidad desconocida cuenta como 0)
+    if has_prob:
+        df = df.sort_values(by=["Prob. %", "Cuota"], ascending=[False, True],
+                            key=lambda s: pd.to_numeric(s, errors="coerce").fillna(0) if s.name == "Prob. %" else s)
+    else:
+        df = df.sort_values(by=["Cuota"])
+    
+    styler = _player_table_styler(df, numeric_cols)
     
-    col_config = {
-        "Cuota": st.column_config.NumberColumn(format="%.2f"),
-        "Prob. %": st.column_config.NumberColumn(format="%.1f%%")
-    }
-            
     st.dataframe(
         styler,
         hide_index=True,
         width='stretch',
-        column_config=col_config,
-        height=min((len(df) + 1) * 35 + 3, 500)
+        height=min(n * 35 + 38, 500)
     )
-    st.markdown("")
 
 
 def _render_player_shots(markets: list, home_team: str, away_team: str, home_id=None, away_id=None, do_analysis: bool = False):
@@ -431,23 +661,16 @@ def _render_player_shots(markets: list, home_team: str, away_team: str, home_id=
                                    metric="shots")
 
 
-def _render_player_cards_markets(markets: list, home_team: str, away_team: str, home_id=None, away_id=None, do_analysis: bool = False):
-    """Renderiza tarjetas de jugadores."""
-    _render_generic_player_table(markets, "Tarjetas", 
-                               home_team, away_team, home_id, away_id,
-                               val_col_name="Tipo", 
-                               is_binary=True,
-                               do_analysis=do_analysis,
-                               metric="yellow_cards")
-
-
+@_in_container
 def _render_player_specials(markets: list, home_team: str, away_team: str, home_id=None, away_id=None, do_analysis: bool = False):
     """Renderiza especiales (asistencias, cabeza, etc)."""
-    data_map = {}
+    name_to_idx = {}
+    columns = {"Equipo": [], "Jugador": []}
+    # Jugador -> métrica de su probabilidad (se calculan en bloque tras recorrer los mercados)
+    prob_metrics = {}
     
     for m in markets:
         lbl = m.get("label", "").lower()
-        m_label = m.get("label", "")
         
         tipo = None
         metric = None
@@ -459,30 +682,45 @@ def _render_player_specials(markets: list, home_team: str, away_team: str, home_
         
         if not tipo: continue
         
-        for out in m.get("outcomes", []):
-            p_name = out.get("participant") or out.get("label")
-            if not p_name: continue
-            
-            if p_name not in data_map:
-                team = _infer_team(out, m_label, home_team, away_team, home_id, away_id)
-                data_map[p_name] = {"Equipo": team, "Jugador": p_name}
+        for out, p_name in _named_outcomes(m.get("outcomes", ())):
+            idx = name_to_idx.get(p_name)
+            if idx is None:
+                team = _infer_team(out, lbl, home_team, away_team, home_id, away_id)
+                idx = _add_player(name_to_idx, columns, p_name, team)
             
-            data_map[p_name][tipo] = out.get("odds")
-            if do_analysis and metric and "Prob. %" not in data_map[p_name]:
-                data_map[p_name]["Prob. %"] = _get_player_weighted_prob(p_name, metric)
+            _set_player_value(columns, idx, tipo, out.get("odds"))
+            if do_analysis and metric and p_name not in prob_metrics:
+                prob_metrics[p_name] = metric
+                # Reserva la columna en su posición; el valor se rellena después
+                _set_player_value(columns, idx, "Prob. %", None)
+    
+    # Una consulta por métrica para todos los jugadores (no una por jugador)
+    names_by_metric = {}
+    for p_name, metric in prob_metrics.items():
+        names_by_metric.setdefault(metric, []).append(p_name)
+    for metric, names in names_by_metric.items():
+        for p_name, prob in zip(names, _get_players_weighted_probs(names, metric)):
+            columns["Prob. %"][name_to_idx[p_name]] = prob
             
-    if not data_map: 
+    if not name_to_idx: 
         st.info("No hay datos de especiales disponibles.")
         return
     
     st.markdown(get_section_title_html("Apuestas Especiales Jugador"), unsafe_allow_html=True)
-    df = pd.DataFrame(list(data_map.values()))
     
     numerics = ["Asistencia", "Fuera Área", "Cabeza", "Prob. %"]
-    valid_numerics = [c for c in numerics if c in df.columns]
+    valid_numerics = [c for c in numerics if c in columns]
+    
+    # Tablas de tamaño habitual -> tabla HTML estática directa desde las columnas
+    if len(name_to_idx) < HTML_TABLE_MAX_ROWS:
+        rows = [dict(zip(columns, values)) for values in zip(*columns.values())]
+        st.markdown(render_html_table(rows, list(columns), valid_numerics, _TABLE_FORMATS), unsafe_allow_html=True)
+        return
+    
+    df = pd.DataFrame(columns)
     
-    styler = _apply_table_styles(df, valid_numerics)
-    st.dataframe(styler, hide_index=True, width='stretch', height=(len(df)+1)*35+3)
+    styler = _player_table_styler(df, valid_numerics)
+    st.dataframe(styler, hide_index=True, width='stretch', height=len(df) * 35 + 38)
 
 
 def _render_player_assists(markets: list, home_team: str, away_team: str, home_id=None, away_id=None, do_analysis: bool = False):
@@ -1,5 +1,72 @@
+import functools
+from html import escape
+from numbers import Real
+import numpy as np
 import pandas as pd
 
+# Colores RGB para interpolación del heatmap
+# Min: #ef4444 (Red-500) -> (239, 68, 68)
+# Mid: #eab308 (Yellow-500) -> (234, 179, 8)
+# Max: #22c55e (Green-500) -> (34, 197, 94)
+_C_MIN = (239, 68, 68)   # Red
+_C_MID = (234, 179, 8)   # Yellow
+_C_MAX = (34, 197, 94)   # Green
+# Posiciones normalizadas de los tres colores y sus valores por canal (R, G, B) para np.interp
+_GRADIENT_STOPS = (0.0, 0.5, 1.0)
+_GRADIENT_CHANNELS = tuple(zip(_C_MIN, _C_MID, _C_MAX))
+
+
+def _gradient_css(values: list) -> list:
+    """
+    Calcula el CSS del mapa de calor (Rojo -> Amarillo -> Verde) para una columna.
+    Valores None/NaN no se colorean. Compartido por el Styler de pandas y las tablas HTML.
+    """
+    n = len(values)
+    # Solo valores numéricos (se ignoran None/NaN y marcadores de texto como "-")
+    mask = np.fromiter((isinstance(v, Real) and v == v for v in values), dtype=bool, count=n)
+    arr = np.zeros(n)
+    arr[mask] = [float(v) for v, ok in zip(values, mask) if ok]
+    valid = arr[mask]
+    # Si no hay variación, devolver estilos vacíos
+    if np.unique(valid).size <= 1:
+        return ['' for _ in values]
+    
+    s_min = valid.min()
+    rng = valid.max() - s_min
+    
+    # Normalizar 0..1 e interpolar por tramos Min -> Mid -> Max (un np.interp por canal)
+    norm = (arr - s_min) / rng
+    r, g, b = (np.interp(norm, _GRADIENT_STOPS, channel).astype(int) for channel in _GRADIENT_CHANNELS)
+    
+    # Color de texto por luminancia (Blanco para extremos oscuros, Negro para amarillo brillante)
+    dark_text = (0.299 * r + 0.587 * g + 0.114 * b) > 140
+    
+    # CSS con transparencia ligera
+    return [
+        f'background-color: rgba({ri},{gi},{bi}, 0.7); color: {"#000000" if dt else "#ffffff"}; font-weight: bold;' if ok else ''
+        for ri, gi, bi, dt, ok in zip(r.tolist(), g.tolist(), b.tolist(), dark_text.tolist(), mask.tolist())
+    ]
+
+
+@functools.lru_cache(maxsize=512)
+def _gradient_css_cached(values: tuple) -> tuple:
+    """
+    _gradient_css memoizado por los valores de la columna: en cada rerun las tablas
+    sin cambios reutilizan el CSS ya calculado. NaN se normaliza a None en la clave.
+    Devuelve una tupla: el resultado se comparte entre llamadas y no debe mutarse.
+    """
+    return tuple(_gradient_css(list(values)))
+
+
+def _column_gradient(values: list) -> tuple:
+    """Gradiente de una columna vía la caché (NaN -> None para que la clave sea estable)."""
+    try:
+        return _gradient_css_cached(tuple(None if v != v else v for v in values))
+    except TypeError:
+        # Valores no hashables: calcular sin caché
+        return tuple(_gradient_css(values))
+
+
 def _apply_table_styles(df: pd.DataFrame, numeric_cols: list = None):
     """
     Aplica estilos estandarizados a las tablas:
@@ -21,54 +88,8 @@ def _apply_table_styles(df: pd.DataFrame, numeric_cols: list = None):
         numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
         
     def get_gradient_style(s):
-        # Si no hay variación, devolver lista vacía
-        if s.nunique() <= 1 or s.empty:
-            return ['' for _ in s]
-            
-        s_min = s.min()
-        s_max = s.max()
-        rng = s_max - s_min
-        
-        # Colores RGB para interpolación
-        # Min: #ef4444 (Red-500) -> (239, 68, 68)
-        # Mid: #eab308 (Yellow-500) -> (234, 179, 8)
-        # Max: #22c55e (Green-500) -> (34, 197, 94)
-        
-        c_min = (239, 68, 68)   # Red
-        c_mid = (234, 179, 8)   # Yellow
-        c_max = (34, 197, 94)   # Green
-        
-        styles = []
-        for val in s:
-            if pd.isna(val):
-                styles.append('')
-                continue
-                
-            # Normalizar 0..1
-            norm = (val - s_min) / rng if rng != 0 else 0
-            
-            # Interpolación
-            if norm <= 0.5:
-                # Interpolar entre Min y Mid (norm va de 0 a 0.5 -> reescalar a 0..1)
-                local_norm = norm / 0.5
-                r = int(c_min[0] + (c_mid[0] - c_min[0]) * local_norm)
-                g = int(c_min[1] + (c_mid[1] - c_min[1]) * local_norm)
-                b = int(c_min[2] + (c_mid[2] - c_min[2]) * local_norm)
-            else:
-                # Interpolar entre Mid y Max (norm va de 0.5 a 1 -> reescalar a 0..1)
-                local_norm = (norm - 0.5) / 0.5
-                r = int(c_mid[0] + (c_max[0] - c_mid[0]) * local_norm)
-                g = int(c_mid[1] + (c_max[1] - c_mid[1]) * local_norm)
-                b = int(c_mid[2] + (c_max[2] - c_mid[2]) * local_norm)
-                
-            # Determinar color de texto (Blanco para extremos oscuros, Negro para amarillo brillante)
-            lum = (0.299*r + 0.587*g + 0.114*b)
-            text_color = '#000000' if lum > 140 else '#ffffff'
-            
-            # Formatear CSS con transparencia ligera
-            styles.append(f'background-color: rgba({r},{g},{b}, 0.7); color: {text_color}; font-weight: bold;')
-            
-        return styles
+        # Lista nueva para el Styler (la tupla cacheada no se entrega a pandas)
+        return list(_column_gradient(s.tolist()))
 
     # Aplicar a columnas numéricas
     for col in numeric_cols:
@@ -106,6 +127,50 @@ def render_styled_table(df: pd.DataFrame, numeric_cols: list = None):
     """
     return f'<div class="dataframe-container">{css}{html}</div>'
 
+# CSS de las tablas HTML estáticas (sin líneas en blanco para no cortar el bloque HTML en markdown)
+_HTML_TABLE_CSS = (
+    "<style>"
+    ".html-table-container table{width:100%;border-collapse:collapse;margin-bottom:16px;}"
+    ".html-table-container th,.html-table-container td{text-align:center;vertical-align:middle;padding:6px 8px;"
+    "border-bottom:1px solid rgba(250,250,250,0.1);}"
+    ".html-table-container th{background-color:#1e3a5f;color:white;font-weight:bold;}"
+    "</style>"
+)
+
+def render_html_table(rows: list, columns: list, numeric_cols: list = None, formats: dict = None) -> str:
+    """
+    Renderiza una tabla HTML estática directamente desde una lista de dicts (sin pandas/Styler).
+    Pensada para tablas pequeñas con st.markdown: incluye centrado y mapa de calor.
+    
+    Args:
+        rows: Filas como dicts {columna: valor}
+        columns: Orden de columnas a mostrar
+        numeric_cols: Columnas con mapa de calor
+        formats: Formato por columna, ej. {"Cuota": "{:.2f}", "Prob. %": "{:.1f}%"}
+    """
+    numeric_cols = numeric_cols or []
+    formats = formats or {}
+    
+    col_styles = {col: _column_gradient([row.get(col) for row in rows]) for col in numeric_cols}
+    
+    head = "".join(f"<th>{escape(str(col))}</th>" for col in columns)
+    body = []
+    for i, row in enumerate(rows):
+        cells = []
+        for col in columns:
+            val = row.get(col)
+            if val is None or val != val:
+                text = ""
+            elif col in formats and isinstance(val, Real):
+                text = formats[col].format(val)
+            else:
+                text = escape(str(val))
+            style = col_styles[col][i] if col in col_styles else ""
+            cells.append(f'<td style="{style}">{text}</td>' if style else f"<td>{text}</td>")
+        body.append(f"<tr>{''.join(cells)}</tr>")
+    
+    return f'<div class="html-table-container">{_HTML_TABLE_CSS}<table><thead><tr>{head}</tr></thead><tbody>{"".join(body)}</tbody></table></div>'
+
 def get_card_html(label: str, odds: float, prob: float = None) -> str:
     """
     Genera el HTML para una 'Card' de apuesta estandarizada.
@@ -122,9 +187,16 @@ def get_card_html(label: str, odds: float, prob: float = None) -> str:
         odds: Cuota decimal
         prob: Probabilidad (0.0 - 1.0) opcional
     """
-    # Formatear cuota y probabilidad
-    if prob is not None:
-        prob_pct = round(prob * 100, 1)
+    # Cuota y probabilidad se redondean antes de la caché para que la clave coincida con lo mostrado
+    prob_pct = round(prob * 100, 1) if prob is not None else None
+    if isinstance(odds, float):
+        odds = round(odds, 2)
+    return _card_html(label, odds, prob_pct)
+
+@functools.lru_cache(maxsize=1024)
+def _card_html(label: str, odds: float, prob_pct: float = None) -> str:
+    """HTML de la card (memoizado por label, cuota y probabilidad redondeada)."""
+    if prob_pct is not None:
         value_display = f"{odds:.2f} <span style='color:#FFD700;font-size:14px;'>({prob_pct}%)</span>"
     else:
         value_display = f"{odds:.2f}"
@@ -136,6 +208,7 @@ def get_card_html(label: str, odds: float, prob: float = None) -> str:
     </div>
     """
 
+@functools.lru_cache(maxsize=1024)
 def get_section_title_html(title: str, coming_soon: bool = False) -> str:
     """
     Genera el HTML para un título de sección estandarizado.
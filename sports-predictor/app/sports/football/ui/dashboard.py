@@ -1,205 +1,332 @@
 """
 Football Dashboard - Modern UI for Data Management with Dynamic League Selector.
 """
+import os
+from collections import namedtuple
 import streamlit as st
 from app.ui import render_metric_card, render_icon
 from app.core.database import get_session
 from app.sports.football.models import Fixture, Team, Player, League, Injury
-from sqlmodel import select, func
+from app.sports.football.etl import FootballETL
+from sqlmodel import select, func, text
 
+# Tablas contadas en el resumen, en el orden de las tarjetas
+_COUNTED_MODELS = (Fixture, Team, Player, League, Injury)
 
-def show_dashboard():
-    """Display the football dashboard with professional UI."""
-    
-    # Header
-    st.markdown(f"""
-    <div style="margin-bottom: 24px;">
-        <h1 style="margin: 0;">{render_icon('dashboard')} Panel de Control</h1>
-        <p style="color: var(--text-secondary); margin-top: 8px;">Gestión de datos, sincronización y estado del sistema</p>
-    </div>
-    """, unsafe_allow_html=True)
-    
-    # Stats Overview
-    st.markdown(f"### {render_icon('database')} Estadísticas de la Base de Datos", unsafe_allow_html=True)
+# Vigencia (s) de los conteos y ligas cacheados; las sincronizaciones desde el panel los invalidan antes
+_DASHBOARD_CACHE_TTL = 30
+
+# Fila de liga, para las estáticas y las de BD
+_LeagueRow = namedtuple("_LeagueRow", "id name country region")
+
+# HTML estático del panel (cabecera y títulos de sección), construido una sola vez al importar
+_HEADER_HTML = f"""
+<div style="margin-bottom: 24px;">
+    <h1 style="margin: 0;">{render_icon('dashboard')} Panel de Control</h1>
+    <p style="color: var(--text-secondary); margin-top: 8px;">Gestión de datos, sincronización y estado del sistema</p>
+</div>
+"""
+_STATS_TITLE_MD = f"### {render_icon('database')} Estadísticas de la Base de Datos"
+_SYNC_TITLE_MD = f"### {render_icon('sync')} Sincronización de Datos"
+
+# Opt-in: en PostgreSQL usar la estimación de pg_class (reltuples) en vez de COUNT(*) exacto
+FAST_COUNTS = os.getenv("DASHBOARD_FAST_COUNTS", "").lower() in ("1", "true", "yes")
+
+_ESTIMATED_COUNTS_SQL = text(
+    "SELECT relname, reltuples::bigint FROM pg_class WHERE relkind = 'r' AND relname = ANY(:tables)"
+)
+
+
+def _estimated_counts(session):
+    """
+    Conteos aproximados desde pg_class (O(1) por tabla). None si alguna tabla
+    aún no tiene estadísticas (reltuples < 0) y hay que contar de verdad.
+    """
+    tables = [model.__tablename__ for model in _COUNTED_MODELS]
+    estimates = dict(session.exec(_ESTIMATED_COUNTS_SQL, params={"tables": tables}).all())
+    counts = tuple(estimates.get(table, -1) for table in tables)
+    return counts if min(counts) >= 0 else None
+
+
+@st.cache_resource(show_spinner=False)
+def _get_etl() -> FootballETL:
+    """FootballETL compartido entre reruns: conserva la sesión HTTP del cliente de la API."""
+    return FootballETL()
+
+
+@st.cache_data(ttl=_DASHBOARD_CACHE_TTL, show_spinner=False)
+def _load_dashboard_stats(fast_counts: bool = False):
+    """
+    Conteos del resumen, cacheados entre reruns: (partidos, equipos, jugadores, ligas, lesiones).
+    Los errores se propagan para que un fallo de BD no quede cacheado.
     
-    # Fetch real counts
-    session = next(get_session())
-    try:
-        fixtures_count = session.exec(select(func.count(Fixture.id))).one()
-        teams_count = session.exec(select(func.count(Team.id))).one()
-        players_count = session.exec(select(func.count(Player.id))).one()
-        leagues_count = session.exec(select(func.count(League.id))).one()
-        injuries_count = session.exec(select(func.count(Injury.id))).one()
-        
-        # Get leagues for dynamic selector
-        leagues_in_db = session.exec(select(League).order_by(League.region, League.name)).all()
-    except Exception:
-        fixtures_count = teams_count = players_count = leagues_count = injuries_count = 0
-        leagues_in_db = []
-    finally:
-        session.close()
+    Args:
+        fast_counts: En PostgreSQL, usar estimaciones de pg_class en vez de COUNT(*)
+    """
+    # La sesión se cierra al salir del bloque, también si la consulta falla
+    with get_session() as session:
+        counts = None
+        if fast_counts and session.get_bind().dialect.name == "postgresql":
+            counts = _estimated_counts(session)
+        if counts is None:
+            # Los cinco COUNT(*) en una sola consulta (subconsultas escalares): un round-trip en vez de cinco
+            counts = tuple(session.exec(
+                select(*(select(func.count()).select_from(model).scalar_subquery() for model in _COUNTED_MODELS))
+            ).one())
+    return counts
+
+
+@st.cache_data(ttl=_DASHBOARD_CACHE_TTL, show_spinner=False)
+def _load_dashboard_leagues():
+    """
+    Ligas en BD para el selector dinámico, cacheadas entre reruns, como _LeagueRow.
+    Solo las columnas usadas, como tuplas con nombre (serializables por la caché), ordenadas
+    en la BD por nombre y país, el mismo orden que la etiqueta "Nombre (País)".
+    """
+    with get_session() as session:
+        return tuple(_LeagueRow._make(row) for row in session.exec(
+            select(League.id, League.name, League.country, League.region).order_by(League.name, League.country)
+        ).all())
+
 
-    col1, col2, col3, col4, col5 = st.columns(5)
+def _clear_dashboard_caches():
+    """
+    Invalida solo las cachés del panel (conteos y ligas) tras una sincronización,
+    sin tocar las del resto de la app (predicciones, mercados, jugadores).
+    """
+    _load_dashboard_stats.clear()
+    _load_dashboard_leagues.clear()
+
+
+def _format_league_label(name, country):
+    return f"{name} ({country})"
+
+
+# Ligas ofrecidas aunque aún no estén en BD, ordenadas por etiqueta al importar
+_STATIC_LEAGUES = tuple(sorted((
+    _LeagueRow(39, "Premier League", "England", "Europe"),
+    _LeagueRow(140, "La Liga", "Spain", "Europe"),
+    _LeagueRow(135, "Serie A", "Italy", "Europe"),
+    _LeagueRow(78, "Bundesliga", "Germany", "Europe"),
+    _LeagueRow(61, "Ligue 1", "France", "Europe"),
+    _LeagueRow(2, "Champions League", "World", "Europe"),
+    _LeagueRow(13, "Copa Libertadores", "South America", "South America"),
+    _LeagueRow(239, "Liga BetPlay", "Colombia", "South America"),
+    _LeagueRow(128, "Liga Profesional", "Argentina", "South America"),
+    _LeagueRow(71, "Brasileirão", "Brazil", "South America"),
+    _LeagueRow(253, "MLS", "USA", "North America"),
+    _LeagueRow(262, "Liga MX", "Mexico", "North America"),
+    _LeagueRow(3, "Europa League", "World", "Europe"),
+    _LeagueRow(11, "Copa Sudamericana", "South America", "South America"),
+    _LeagueRow(40, "Championship", "England", "Europe"),
+    _LeagueRow(94, "Primeira Liga", "Portugal", "Europe"),
+    _LeagueRow(88, "Eredivisie", "Netherlands", "Europe"),
+    _LeagueRow(307, "Pro League", "Saudi Arabia", "Asia"),
+), key=lambda row: _format_league_label(row.name, row.country)))
+
+# Opciones de las ligas estáticas, precalculadas al importar
+_STATIC_BY_ID = {
+    row.id: {"id": row.id, "label": _format_league_label(row.name, row.country), "region": row.region}
+    for row in _STATIC_LEAGUES
+}
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _build_league_options(db_leagues: tuple):
+    """
+    Fusiona las ligas de BD (id, nombre, país, región) con las estáticas que falten.
+    Devuelve (options_by_region, available_regions): opciones (id, etiqueta) ordenadas por etiqueta
+    e indexadas por región, con todas bajo "Todas", y la tupla ordenada de regiones.
+    """
+    # DB leagues first, then static leagues not in DB
+    final_options = [
+        {"id": row.id, "label": _format_league_label(row.name, row.country), "region": row.region or "Other"}
+        for row in db_leagues
+    ]
+    db_league_ids = {row.id for row in db_leagues}
+    final_options.extend(opt for lid, opt in _STATIC_BY_ID.items() if lid not in db_league_ids)
     
-    with col1:
-        st.markdown(render_metric_card(str(fixtures_count), "Partidos", "accent"), unsafe_allow_html=True)
-    with col2:
-        st.markdown(render_metric_card(str(teams_count), "Equipos", "success"), unsafe_allow_html=True)
-    with col3:
-        st.markdown(render_metric_card(str(players_count), "Jugadores", "warning"), unsafe_allow_html=True)
-    with col4:
-        st.markdown(render_metric_card(str(leagues_count), "Ligas", "danger"), unsafe_allow_html=True)
-    with col5:
-        st.markdown(render_metric_card(str(injuries_count), "Lesiones", "accent"), unsafe_allow_html=True)
+    # Sort options: BD y estáticas llegan ya ordenadas, así que timsort solo fusiona dos tramos (lineal)
+    final_options.sort(key=lambda x: x["label"])
+    return _index_league_options(final_options)
+
+
+def _index_league_options(final_options: list):
+    """Indexa opciones ya ordenadas: (options_by_region, available_regions)."""
+    # Prepare lists for selectbox: región -> opciones, para que el filtro sea una búsqueda en dict
+    options_by_region = {"Todas": []}
+    for opt in final_options:
+        option = (opt["id"], opt["label"])
+        options_by_region["Todas"].append(option)
+        options_by_region.setdefault(opt["region"], []).append(option)
     
-    st.markdown("<br>", unsafe_allow_html=True)
+    # Extract available regions for filtering
+    available_regions = tuple(sorted(region for region in options_by_region if region != "Todas"))
+    return options_by_region, available_regions
+
+
+# Índice cuando la BD no tiene ligas (instalación nueva o error): solo las estáticas, ya ordenadas
+_STATIC_LEAGUE_OPTIONS = _index_league_options(list(_STATIC_BY_ID.values()))
+
+
+def _run_etl(spinner_label: str, success_message: str, error_prefix: str, fn, **kwargs):
+    """
+    Ejecuta una sincronización con spinner. Si termina bien invalida las cachés del panel y
+    relanza el script para refrescar los conteos; el mensaje de éxito se guarda en la sesión
+    para mostrarlo en ese rerun. Si falla muestra el error (sin rerun).
     
-    # ═══════════════════════════════════════════════════════
-    # SYNC SECTION - REDESIGNED
-    # ═══════════════════════════════════════════════════════
-    st.markdown(f"### {render_icon('sync')} Sincronización de Datos", unsafe_allow_html=True)
+    Args:
+        success_message: Plantilla formateada con el resultado de fn
+    """
+    with st.spinner(spinner_label):
+        try:
+            result = fn(**kwargs)
+        except Exception as e:
+            st.error(f"{error_prefix}: {e}")
+            return
+    _clear_dashboard_caches()
+    st.session_state["_dashboard_sync_msg"] = success_message.format(result)
+    st.rerun()
+
+
+def _render_sync_panel():
+    """Contenido de "Configuración de Descarga": selector de liga y acciones de sincronización."""
+    # Ligas en BD (cacheadas); solo se consultan con el panel abierto
+    try:
+        leagues_in_db = _load_dashboard_leagues()
+    except Exception:
+        leagues_in_db = ()
     
     # Build league options - Merge DB with Static for better UX
-    static_leagues = [
-        (39, "Premier League", "England", "Europe"),
-        (140, "La Liga", "Spain", "Europe"),
-        (135, "Serie A", "Italy", "Europe"),
-        (78, "Bundesliga", "Germany", "Europe"),
-        (61, "Ligue 1", "France", "Europe"),
-        (2, "Champions League", "World", "Europe"),
-        (13, "Copa Libertadores", "South America", "South America"),
-        (239, "Liga BetPlay", "Colombia", "South America"),
-        (128, "Liga Profesional", "Argentina", "South America"),
-        (71, "Brasileirão", "Brazil", "South America"),
-        (253, "MLS", "USA", "North America"),
-        (262, "Liga MX", "Mexico", "North America"),
-        (3, "Europa League", "World", "Europe"),
-        (11, "Copa Sudamericana", "South America", "South America"),
-        (40, "Championship", "England", "Europe"),
-        (94, "Primeira Liga", "Portugal", "Europe"),
-        (88, "Eredivisie", "Netherlands", "Europe"),
-        (307, "Pro League", "Saudi Arabia", "Asia"),
-    ]
+    # Se guardan en la sesión junto a las ligas de BD de las que salen: mientras no cambien,
+    # los reruns reutilizan el índice sin pasar por la caché (que devuelve copias).
+    league_index = st.session_state.get("_dashboard_league_index")
+    if league_index is None or league_index[0] != leagues_in_db:
+        options = _build_league_options(leagues_in_db) if leagues_in_db else _STATIC_LEAGUE_OPTIONS
+        league_index = st.session_state["_dashboard_league_index"] = (leagues_in_db, options)
+    options_by_region, available_regions = league_index[1]
 
-    # Create a dict of existing leagues to avoid duplicates
-    db_league_ids = {l.id for l in leagues_in_db}
-    
-    # Start with DB leagues
-    final_options = []
-    
-    # Helper to format label
-    def format_league_label(name, country):
-        return f"{name} ({country})"
-
-    # Add DB leagues first
-    for league in leagues_in_db:
-        final_options.append({
-            "id": league.id,
-            "label": format_league_label(league.name, league.country),
-            "region": league.region or "Other"
-        })
-
-    # Add static leagues if not in DB
-    for lid, name, country, region in static_leagues:
-        if lid not in db_league_ids:
-            final_options.append({
-                "id": lid,
-                "label": format_league_label(name, country),
-                "region": region
-            })
-    
-    # Sort options
-    final_options.sort(key=lambda x: x["label"])
-    
-    # Prepare list for selectbox
-    league_options = [(opt["id"], opt["label"]) for opt in final_options]
-    
-    # Extract available regions for filtering
-    available_regions = sorted(list(set(opt["region"] for opt in final_options)))
-
-    # Main sync card with expander for cleaner look
-    with st.expander("Configuración de Descarga", expanded=True):
-        
-        # Region Filter (Top for better flow)
-        selected_region = "Todas"
-        if available_regions:
-            col_filter, _ = st.columns([1, 2])
-            with col_filter:
-                selected_region = st.selectbox(
-                    "Filtrar por Región",
-                    options=["Todas"] + sorted(available_regions),
-                    index=0
-                )
-        
-        # Apply filter
-        filtered_options = league_options
-        if selected_region != "Todas":
-            filtered_options = [(opt["id"], opt["label"]) for opt in final_options if opt["region"] == selected_region]
+    # Region Filter (Top for better flow)
+    selected_region = "Todas"
+    if available_regions:
+        col_filter, _ = st.columns([1, 2])
+        with col_filter:
+            selected_region = st.selectbox(
+                "Filtrar por Región",
+                options=("Todas",) + available_regions,
+                index=0,
+                key="dashboard_region"
+            )
+
+    # Apply filter
+    filtered_options = options_by_region[selected_region]
 
+    # Formulario: liga, temporada y opciones solo provocan un rerun al pulsar una acción.
+    # El filtro de región queda fuera porque cambia las opciones de "Competición".
+    with st.form("sync_form", border=False):
         # Row 1: League and Season
         col_league, col_season = st.columns([3, 1])
-        
+
         with col_league:
             league_id = st.selectbox(
                 "Competición",
                 options=filtered_options,
                 format_func=lambda x: x[1],
+                key="dashboard_league"
             )
-        
+
         with col_season:
             season = st.selectbox(
                 "Temporada",
                 options=[2026, 2025, 2024, 2023, 2022],
-                index=0
+                index=0,
+                key="dashboard_season"
             )
 
         # Options
         sync_details = st.checkbox("Incluir Detalles (Alineaciones)", value=False, help="Descarga lineups y estadísticas de jugadores")
-        
+
         st.markdown("<br>", unsafe_allow_html=True)
-        
+
         # Row 3: Action buttons
         b1, b2, b3 = st.columns(3)
-        
+
         with b1:
-            sync_button = st.button("Sincronizar Liga", type="primary", width='stretch')
-        
+            sync_button = st.form_submit_button("Sincronizar Liga", type="primary", width='stretch')
+
         with b2:
-            batch_btn = st.button("Sync Prioritarias", type="secondary", width='stretch', help="Todas las Tier 1 y 2")
-             
+            batch_btn = st.form_submit_button("Sync Prioritarias", type="secondary", width='stretch', help="Todas las Tier 1 y 2")
+
         with b3:
-            injuries_btn = st.button("Sync Lesiones", type="secondary", width='stretch')
-
-        # Logic implementation
-        if sync_button:
-            with st.spinner(f"Sincronizando {league_id[1]}..."):
-                try:
-                    from app.sports.football.etl import FootballETL
-                    etl = FootballETL()
-                    count = etl.sync_league_data(league_id=league_id[0], season=season, sync_details=sync_details)
-                    st.success(f"Operación completada: {count} partidos sincronizados.")
-                    st.rerun()
-                except Exception as e:
-                    st.error(f"Error: {e}")
-
-        if batch_btn:
-             with st.spinner("Sincronizando Tier 1 y Tier 2..."):
-                try:
-                    from app.sports.football.etl import FootballETL
-                    etl = FootballETL()
-                    res = etl.sync_priority_leagues(season=season, sync_details=False)
-                    st.success(f"Batch completado: {res['success']} ligas procesadas correctamente.")
-                    st.rerun()
-                except Exception as e:
-                    st.error(f"Error Batch: {e}")
-
-        if injuries_btn:
-            with st.spinner("Buscando lesiones..."):
-                try:
-                    from app.sports.football.etl import FootballETL
-                    etl = FootballETL()
-                    count = etl.sync_injuries(league_id=league_id[0], season=season)
-                    st.success(f"Lesiones actualizadas: {count}")
-                    st.rerun()
-                except Exception as e:
-                    st.error(f"Error Lesiones: {e}")
+            injuries_btn = st.form_submit_button("Sync Lesiones", type="secondary", width='stretch')
+
+    # Logic implementation
+    if sync_button:
+        _run_etl(
+            f"Sincronizando {league_id[1]}...", "Operación completada: {} partidos sincronizados.", "Error",
+            _get_etl().sync_league_data, league_id=league_id[0], season=season, sync_details=sync_details
+        )
+
+    if batch_btn:
+        _run_etl(
+            "Sincronizando Tier 1 y Tier 2...", "Batch completado: {0[success]} ligas procesadas correctamente.", "Error Batch",
+            _get_etl().sync_priority_leagues, season=season, sync_details=False
+        )
+
+    if injuries_btn:
+        _run_etl(
+            "Buscando lesiones...", "Lesiones actualizadas: {}", "Error Lesiones",
+            _get_etl().sync_injuries, league_id=league_id[0], season=season
+        )
+
+
+def show_dashboard():
+    """Display the football dashboard with professional UI."""
+    
+    # Header
+    st.markdown(_HEADER_HTML, unsafe_allow_html=True)
+    
+    # Stats Overview
+    st.markdown(_STATS_TITLE_MD, unsafe_allow_html=True)
+    
+    # Fetch real counts (cacheados; se invalidan tras cada sincronización)
+    try:
+        counts = _load_dashboard_stats(FAST_COUNTS)
+    except Exception:
+        counts = (0,) * len(_COUNTED_MODELS)
+    fixtures_count, teams_count, players_count, leagues_count, injuries_count = counts
+
+    # Las cinco tarjetas en un solo bloque HTML (un único elemento en vez de 5 columnas + 5 markdown)
+    cards = (
+        (fixtures_count, "Partidos", "accent"),
+        (teams_count, "Equipos", "success"),
+        (players_count, "Jugadores", "warning"),
+        (leagues_count, "Ligas", "danger"),
+        (injuries_count, "Lesiones", "accent"),
+    )
+    # strip(): sin líneas en blanco entre tarjetas que corten el bloque HTML en markdown
+    st.markdown(
+        '<div style="display:grid;grid-template-columns:repeat(5,1fr);gap:16px;">'
+        + "".join(render_metric_card(str(count), label, variant).strip() for count, label, variant in cards)
+        + "</div>",
+        unsafe_allow_html=True
+    )
+    
+    st.markdown("<br>", unsafe_allow_html=True)
+    
+    # ═══════════════════════════════════════════════════════
+    # SYNC SECTION - REDESIGNED
+    # ═══════════════════════════════════════════════════════
+    st.markdown(_SYNC_TITLE_MD, unsafe_allow_html=True)
+    
+    # Resultado de la última sincronización (guardado antes del rerun que refresca los conteos)
+    sync_msg = st.session_state.pop("_dashboard_sync_msg", None)
+    if sync_msg:
+        st.success(sync_msg)
+    
+    # Main sync card with expander for cleaner look.
+    # on_change="rerun" expone .open: el contenido (y la consulta de ligas) solo se ejecuta con el panel abierto
+    sync_expander = st.expander("Configuración de Descarga", expanded=True, key="dashboard_sync_expander", on_change="rerun")
+    with sync_expander:
+        if sync_expander.open:
+            _render_sync_panel()
@@ -11,7 +11,7 @@ from app.sports.football.models import Player, Team, League, Fixture
 def show_player_browser():
     st.title("🏃 Explorador de Jugadores")
     
-    with next(get_session()) as session:
+    with get_session() as session:
         # 1. Filtro de Liga
         leagues = session.exec(select(League).order_by(League.name)).all()
         league_options = {l.name: l.id for l in leagues}
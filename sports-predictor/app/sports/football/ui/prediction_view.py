@@ -22,12 +22,9 @@ def get_teams_from_db():
     if is_demo_mode():
         return []
     
-    session = next(get_session())
-    try:
+    with get_session() as session:
         stmt = select(Team).order_by(Team.name)
         return session.exec(stmt).all()
-    finally:
-        session.close()
 
 
 def get_leagues_from_db():
@@ -35,12 +32,9 @@ def get_leagues_from_db():
     if is_demo_mode():
         return []
     
-    session = next(get_session())
-    try:
+    with get_session() as session:
         stmt = select(League).order_by(League.name)
         return session.exec(stmt).all()
-    finally:
-        session.close()
 
 
 def get_team_stats_from_db(team_id: int, last_n: int = 10):
@@ -48,8 +42,7 @@ def get_team_stats_from_db(team_id: int, last_n: int = 10):
     if is_demo_mode() or not team_id:
         return None
     
-    session = next(get_session())
-    try:
+    with get_session() as session:
         corners = get_team_corners_avg(team_id, last_n, session)
         corners_conceded = get_team_corners_conceded_avg(team_id, last_n, session)
         possession = get_team_possession_avg(team_id, last_n, session)
@@ -88,8 +81,6 @@ def get_team_stats_from_db(team_id: int, last_n: int = 10):
             "shots_on_goal_avg": shots["on_goal"],
             "matches_analyzed": total_matches
         }
-    finally:
-        session.close()
 
 
 def show_prediction_view():
@@ -73,9 +73,7 @@ def show_match_detail_view():
     from sqlmodel import select
     from app.sports.football.models import Fixture
     
-    db_session = next(get_session())
-    
-    try:
+    with get_session() as db_session:
         # --- ID RESOLUTION STRATEGY (FAIL-SAFE) ---
         # Prioridad 1: Auto-match con fuzzy logic (usa BD)
         mapped_home_id = get_mapped_team_id(home_team, db_session)
@@ -118,9 +116,6 @@ def show_match_detail_view():
             if has_data:
                 predictions = get_full_match_prediction(home_id, away_id, db_session)
     
-    finally:
-        db_session.close()
-    
     # Mensaje si no hay datos
     if not has_data and (home_id or away_id):
         st.info("ℹ️ No hay datos históricos para estos equipos. Sincroniza su liga desde el Panel de Control para ver probabilidades.")
@@ -2,6 +2,7 @@
 UI Theme and Styling Configuration.
 Custom CSS for dark/light mode with modern aesthetics and Material Symbols.
 """
+import functools
 
 # Material Symbols Font (Outlined)
 ICON_FONT = """
@@ -403,8 +404,9 @@ def get_theme_css(is_dark: bool = True) -> str:
     return base_theme + MOBILE_NAV_CSS
 
 
+@functools.lru_cache(maxsize=64)
 def render_icon(name: str, size: str = "normal", color: str = "inherit") -> str:
-    """Render a Material Symbol icon."""
+    """Render a Material Symbol icon (memoized: a small fixed set of icons is rendered on every rerun)."""
     size_cls = f"icon-{size}" if size != "normal" else ""
     style = f"color: {color};" if color != "inherit" else ""
     return f'<span class="icon {size_cls}" style="{style}">{name}</span>'
@@ -11,7 +11,7 @@ from app.sports.football.models import Team, Fixture
 def extract_laliga_teams():
     LEAGUE_ID = 140
     
-    with next(get_session()) as session:
+    with get_session() as session:
         # 1. Find all matches for La Liga
         statement = select(Fixture).where(Fixture.league_id == LEAGUE_ID)
         fixtures = session.exec(statement).all()
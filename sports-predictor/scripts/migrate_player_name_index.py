@@ -0,0 +1,43 @@
+"""
+Script de Migración - Índice funcional sobre lower(name) en 'football_player'.
+Acelera la resolución de nombres de jugadores del análisis de mercados (búsqueda sin
+distinguir mayúsculas). Ejecutar una sola vez; es idempotente.
+"""
+import os
+import sys
+from pathlib import Path
+
+# Configuración de rutas
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from dotenv import load_dotenv
+load_dotenv(PROJECT_ROOT / '.env')
+
+from sqlalchemy import create_engine, text
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+if not DATABASE_URL:
+    print("ERROR: DATABASE_URL no encontrada en .env")
+    exit(1)
+
+print("Conectando a la base de datos...")
+engine = create_engine(DATABASE_URL)
+
+with engine.connect() as conn:
+    try:
+        # Índice de expresión: lo usan las igualdades y prefijos sobre lower(name)
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS ix_football_player_name_lower
+            ON football_player (lower(name))
+        """))
+        print("Creado: ix_football_player_name_lower")
+
+        conn.commit()
+        print("\n✅ ¡Migración completada con éxito!")
+
+    except Exception as e:
+        # En caso de error, deshacer cambios parciales
+        print(f"\n❌ Error en la migración: {e}")
+        conn.rollback()
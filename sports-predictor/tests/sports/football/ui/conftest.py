@@ -0,0 +1,21 @@
+from contextlib import contextmanager
+import pytest
+
+
+@pytest.fixture
+def patch_get_session(monkeypatch):
+    """
+    Sustituye get_session de un módulo por un contexto que entrega la sesión dada.
+    Devuelve la lista de llamadas para comprobar cuántas sesiones se abren.
+    """
+    def patch(module, session) -> list:
+        calls = []
+
+        @contextmanager
+        def fake_get_session():
+            calls.append(1)
+            yield session
+
+        monkeypatch.setattr(module, "get_session", fake_get_session)
+        return calls
+    return patch
@@ -0,0 +1,82 @@
+import pytest
+from app.sports.football.ui import dashboard
+from app.sports.football.ui.dashboard import (
+    _STATIC_LEAGUE_OPTIONS, _STATIC_LEAGUES, _LeagueRow, _build_league_options,
+    _load_dashboard_leagues, _load_dashboard_stats,
+)
+
+
+@pytest.fixture
+def session():
+    from sqlmodel import SQLModel, Session, create_engine
+    from app.sports.football.models import League, Team, Player
+
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add_all([
+            League(id=39, name="Premier League", country="England", season=2024, region="Europe"),
+            League(id=239, name="Liga BetPlay", country="Colombia", season=2024, region="South America"),
+        ])
+        session.add_all([Team(id=1, name="Roma"), Team(id=2, name="Lecce")])
+        session.add(Player(id=1, name="Paulo Dybala"))
+        session.commit()
+        yield session
+
+
+@pytest.fixture
+def use_session(session, patch_get_session):
+    calls = patch_get_session(dashboard, session)
+    _load_dashboard_stats.clear()
+    _load_dashboard_leagues.clear()
+    yield calls
+    _load_dashboard_stats.clear()
+    _load_dashboard_leagues.clear()
+
+
+def test_load_dashboard_stats(use_session):
+    counts = _load_dashboard_stats()
+    assert counts == (0, 2, 1, 2, 0)
+    leagues = _load_dashboard_leagues()
+    # Ordenadas por nombre en la BD (mismo orden que las etiquetas del selector)
+    assert leagues == ((239, "Liga BetPlay", "Colombia", "South America"), (39, "Premier League", "England", "Europe"))
+    # Reruns sin cambios no vuelven a consultar la BD
+    assert _load_dashboard_stats() == counts and _load_dashboard_leagues() == leagues
+    assert len(use_session) == 2
+
+
+def test_counts_use_a_single_statement(session, use_session):
+    from sqlalchemy import event
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(session.get_bind(), "before_cursor_execute", record)
+    try:
+        _load_dashboard_stats()
+    finally:
+        event.remove(session.get_bind(), "before_cursor_execute", record)
+    assert len(statements) == 1
+    assert statements[0].count("count(*)") == 5
+
+
+def test_fast_counts_fall_back_to_exact_outside_postgres(use_session):
+    counts = _load_dashboard_stats(fast_counts=True)
+    assert counts == (0, 2, 1, 2, 0)
+
+
+def test_build_league_options_merges_db_and_static():
+    db_leagues = (_LeagueRow(39, "Premier League", "England", "Europe"), _LeagueRow(999, "Liga Local", "Chile", None))
+    options_by_region, regions = _build_league_options(db_leagues)
+    league_options = options_by_region["Todas"]
+    # La liga de BD reemplaza a la estática con el mismo id; las demás estáticas se añaden
+    assert len(league_options) == len(_STATIC_LEAGUES) + 1
+    assert (999, "Liga Local (Chile)") in league_options
+    assert [label for _, label in league_options] == sorted(label for _, label in league_options)
+    assert regions == ("Asia", "Europe", "North America", "Other", "South America")
+    assert options_by_region["Other"] == [(999, "Liga Local (Chile)")]
+
+
+def test_static_league_options_match_merge_without_db_leagues():
+    assert _build_league_options(()) == _STATIC_LEAGUE_OPTIONS
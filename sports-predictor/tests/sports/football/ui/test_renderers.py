@@ -0,0 +1,183 @@
+import pytest
+from app.sports.football.analytics.predictive.goals import predict_goals_markets, predict_halftime_markets
+from app.sports.football.ui.components.renderers.common import _compute_card_probs, _handicaps_by_line, _normalize_lines, _ou_by_line, _sort_correct_scores
+from app.sports.football.ui.components.renderers.players import (
+    _build_player_index, _bulk_player_histories, _cached_player_histories, _get_players_weighted_probs,
+    _infer_team, _infer_teams, _load_player_index,
+)
+
+
+@pytest.fixture
+def analysis_data():
+    preds = predict_goals_markets(1.4, 1.1)
+    return {
+        "1x2": {"home_win": preds["1x2"]["home"], "draw": preds["1x2"]["draw"], "away_win": preds["1x2"]["away"]},
+        "btts": preds["btts"],
+        "over_under": preds["over_under"],
+        "halftime": predict_halftime_markets(1.4, 1.1),
+        "corners": None,
+        "cards": {"winner": {"home": 0.4, "draw": 0.2, "away": 0.4}},
+    }
+
+
+class TestCardProbs:
+    def test_full_time_1x2(self, analysis_data):
+        probs = _compute_card_probs("Resultado Final", analysis_data)
+        assert probs == {"1": analysis_data["1x2"]["home_win"], "X": analysis_data["1x2"]["draw"], "2": analysis_data["1x2"]["away_win"]}
+
+    def test_halves(self, analysis_data):
+        ht_btts = analysis_data["halftime"]["btts"]
+        assert _compute_card_probs("Ambos equipos marcarán - 1.ª parte", analysis_data)["Sí"] == ht_btts["yes"]
+        assert _compute_card_probs("Ambos equipos marcarán - 2.ª parte", analysis_data) == {}
+
+    def test_double_chance_sums(self, analysis_data):
+        probs = _compute_card_probs("Doble oportunidad", analysis_data)
+        data = analysis_data["1x2"]
+        assert probs["1X"] == pytest.approx(data["home_win"] + data["draw"])
+
+    def test_winner_markets(self, analysis_data):
+        # Sin datos de corners no hay probabilidades; tarjetas sí
+        assert _compute_card_probs("Mayor número de tiros de esquina", analysis_data) == {}
+        assert _compute_card_probs("Mayor número de tarjetas", analysis_data)["X"] == 0.2
+
+    def test_unknown_market(self, analysis_data):
+        assert _compute_card_probs("Mercado raro", analysis_data) == {}
+
+
+def test_ou_by_line_float_keys():
+    table = _ou_by_line({"2.5": {"over": 0.6, "under": 0.4}})
+    assert table[2.5] == (0.6, 0.4)
+    assert _ou_by_line(None) == {}
+
+
+def test_handicaps_by_line_float_keys():
+    table = _handicaps_by_line({"-1.0": {"win": 0.5, "loss": 0.3, "push": 0.2}})
+    assert table[-1.0] == (0.5, 0.3, 0.2)
+    assert table.get(-1) == (0.5, 0.3, 0.2)
+
+
+def test_normalize_lines():
+    vals, valid, texts = _normalize_lines(["2500", "-1.0", 0.75, None, "abc"])
+    assert vals[:3] == [2.5, -1.0, 0.75]
+    assert valid == [True, True, True, False, False]
+    assert texts[:3] == ["2.5", "-1", "0.75"]
+
+
+def test_sort_correct_scores():
+    outcomes = [{"label": "2-1"}, {"label": "Otro"}, {"label": "0-0"}, {"label": "1 - 0"}]
+    ordered, probs = _sort_correct_scores(outcomes, {"0-0": 0.1, "1-0": 0.12})
+    assert [o["label"] for o in ordered] == ["0-0", "1 - 0", "2-1", "Otro"]
+    assert probs == [10.0, 12.0, None, None]
+
+
+def test_infer_teams_matches_scalar():
+    outcomes = [{"eventParticipantId": 1}, {"eventParticipantId": 2}, {"team": "T"}, {"competitorName": "C"}, {}, {}, {}]
+    labels = ["x", "x", "x", "x", "Goles Roma", "Goles Lazio", "Otro"]
+    expected = [_infer_team(o, l.lower(), "Roma", "Lazio", 1, 2) for o, l in zip(outcomes, labels)]
+    assert _infer_teams(outcomes, labels, "Roma", "Lazio", 1, 2) == expected == ["Roma", "Lazio", "T", "C", "Roma", "Lazio", "-"]
+    # Equipos desconocidos (None): mismas prioridades que la versión escalar
+    for home, away in (("Roma", None), (None, "Lazio"), (None, None)):
+        expected = [_infer_team(o, l.lower(), home, away, 1, 2) for o, l in zip(outcomes, labels)]
+        assert _infer_teams(outcomes, labels, home, away, 1, 2) == expected
+
+
+class TestBulkPlayerHistories:
+    @pytest.fixture
+    def session(self):
+        from datetime import datetime, timedelta, timezone
+        from sqlmodel import SQLModel, Session, create_engine
+        from app.sports.football.models import League, Team, Player, Fixture, PlayerMatchStats
+
+        engine = create_engine("sqlite://")
+        SQLModel.metadata.create_all(engine)
+        with Session(engine) as session:
+            session.add(League(id=1, name="Serie A", country="Italy", season=2024))
+            session.add_all([Team(id=1, name="Roma"), Team(id=2, name="Lecce")])
+            session.add_all([Player(id=1, name="Paulo Dybala"), Player(id=2, name="Nikola Krstovic")])
+            base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+            for i in range(25):
+                session.add(Fixture(id=i + 1, date=base + timedelta(days=i), league_id=1, home_team_id=1, away_team_id=2))
+                session.add(PlayerMatchStats(fixture_id=i + 1, player_id=1, team_id=1, goals=i % 2))
+            session.add(PlayerMatchStats(fixture_id=25, player_id=2, team_id=2, goals=1))
+            session.add_all([Player(id=3, name="Pedro Martínez"), Player(id=4, name="Pedro")])
+            session.add(PlayerMatchStats(fixture_id=25, player_id=3, team_id=1, goals=0))
+            session.add(PlayerMatchStats(fixture_id=25, player_id=4, team_id=1, goals=2))
+            session.commit()
+            yield session
+
+    def test_groups_recent_history_per_name(self, session):
+        from app.sports.football.models import PlayerMatchStats
+        histories = _bulk_player_histories(session, ["Dybala", "Krstovic", "Desconocido"], PlayerMatchStats.goals)
+        assert set(histories) == {"Dybala", "Krstovic"}
+        # Más reciente primero (fixture 25 -> goals 0) y recortado a 20 partidos
+        assert histories["Dybala"] == [(24 - i) % 2 for i in range(20)]
+        assert histories["Krstovic"] == [1]
+
+    def test_exact_name_wins_over_substring(self, session):
+        from app.sports.football.models import PlayerMatchStats
+        histories = _bulk_player_histories(session, ["pedro", "MARTÍNEZ"], PlayerMatchStats.goals)
+        assert histories == {"pedro": [2], "MARTÍNEZ": [0]}
+
+    def test_normalized_index_resolves_accents(self, session):
+        from app.sports.football.models import Player, PlayerMatchStats
+        session.add(Player(id=5, name="José  Giménez"))
+        session.add(PlayerMatchStats(fixture_id=25, player_id=5, team_id=1, goals=3))
+        session.commit()
+        index = _build_player_index(session)
+        assert index["jose gimenez"] == 5
+        # "Jose Gimenez" no lo encuentra el LIKE (acentos); "Krstovic" no está en el índice y cae al LIKE
+        histories = _bulk_player_histories(session, ["Jose Gimenez", "Krstovic"], PlayerMatchStats.goals, name_index=index)
+        assert histories == {"Jose Gimenez": [3], "Krstovic": [1]}
+        assert "Jose Gimenez" not in _bulk_player_histories(session, ["Jose Gimenez"], PlayerMatchStats.goals)
+
+    def test_empty_names(self, session):
+        from app.sports.football.models import PlayerMatchStats
+        assert _bulk_player_histories(session, [], PlayerMatchStats.goals) == {}
+
+    def test_weighted_probs_cached_across_calls(self, session, patch_get_session):
+        from app.sports.football.ui.components.renderers import players
+        calls = patch_get_session(players, session)
+        _cached_player_histories.clear()
+        _load_player_index.clear()
+        probs = _get_players_weighted_probs(["Krstovic", "Dybala", "Desconocido"], "goals", [0.5, 2.5, 0.5])
+        assert probs == [100.0, 0.0, None]
+        # Mismos jugadores en otro orden y otro umbral: se reutiliza el historial cacheado
+        again = _get_players_weighted_probs(["Desconocido", "Dybala", "Krstovic"], "goals")
+        assert again[0] is None and again[2] == 100.0 and 0 < again[1] < 100
+        assert len(calls) == 1  # índice de nombres e historiales comparten sesión
+
+
+def test_redistribute_markets_leaves_input_untouched():
+    from app.sports.football.ui.components.market_logic import _redistribute_markets
+    saves = {"label": "Paradas del portero", "outcomes": [{"label": "Más de 2.5", "odds": 1.8}]}
+    hybrid = {"label": "Marcará o dará asistencia", "outcomes": []}
+    ft = {"label": "Resultado Final", "outcomes": []}
+    markets = {"tiempo_reglamentario": [ft, saves], "asistencias_jugador": [hybrid]}
+    result = _redistribute_markets(markets)
+    assert result == {"tiempo_reglamentario": [ft], "asistencias_jugador": [], "paradas_portero": [saves],
+                      "apuestas_especiales_jugador": [hybrid]}
+    assert markets == {"tiempo_reglamentario": [ft, saves], "asistencias_jugador": [hybrid]}
+    # Los mercados se reubican por referencia, sin copiarlos
+    assert result["paradas_portero"][0] is saves
+
+
+def test_specials_probs_in_one_call(monkeypatch):
+    from app.sports.football.ui.components.renderers import players
+    calls = []
+
+    def fake_probs(names, metric, thresholds=None, alpha=0.15):
+        calls.append((list(names), metric))
+        return [50.0] * len(names)
+
+    monkeypatch.setattr(players, "_get_players_weighted_probs", fake_probs)
+    rendered = []
+    monkeypatch.setattr(players, "render_html_table", lambda rows, cols, *a: rendered.append((rows, cols)) or "")
+    markets = [
+        {"label": "Dará una asistencia", "outcomes": [{"participant": "A", "odds": 2.0}, {"participant": "B", "odds": 3.0}]},
+        {"label": "Marcará de cabeza", "outcomes": [{"participant": "A", "odds": 5.0}, {"participant": "C", "odds": 6.0}]},
+    ]
+    players._render_player_specials(markets, "Roma", "Lazio", do_analysis=True)
+    assert calls == [(["A", "B"], "assists")]
+    rows, cols = rendered[0]
+    assert cols == ["Equipo", "Jugador", "Asistencia", "Prob. %", "Cabeza"]
+    assert [row["Prob. %"] for row in rows] == [50.0, 50.0, None]